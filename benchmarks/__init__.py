@@ -0,0 +1,16 @@
+# Benchmarks
+# ----------
+# Timing scripts over the bundled icons/svg corpus
+# Run from repository root - python -m benchmarks.<name>
+
+# benchmarks
+# ├─ background
+# ├─ path_tokenizer
+# ├─ path_geometry
+# ├─ async_renders
+# ├─ thread_stress
+# ├─ render_stages
+# ├─ color_parse
+# ├─ rasterizer
+# ├─ parse_stream
+# └─ shared_memory
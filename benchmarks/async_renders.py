@@ -0,0 +1,107 @@
+# Async Renders Harness
+# ---------------------
+# Runs many concurrent renders through icongen.aio against icons/svg
+# Checks every result matches a serial render, and that cancelling
+# a request stops its remaining renders, exits non-zero if either fails
+
+from typing import Tuple
+
+import glob
+import time
+import asyncio
+import argparse
+import itertools
+
+from icongen.aio import AsyncRenderer
+from icongen.palette import PALETTES
+from icongen.stream import RenderSpec, render_bytes
+
+
+def build_specs(corpus: str, count: int, size: int):
+    filenames = sorted(glob.glob(corpus))
+    combos = itertools.cycle(itertools.product(filenames, sorted(PALETTES)))
+    return [
+        RenderSpec(svg_path, color, size, "icns" if i % 8 == 7 else "png")
+        for i, (svg_path, color) in enumerate(itertools.islice(combos, count))
+    ]
+
+
+async def run_requests(renderer: AsyncRenderer, specs, requests: int):
+    """ Split specs over concurrent requests, each with its own limit """
+
+    async def request(chunk):
+        return [item async for item in renderer.render_many(chunk, concurrency=2)]
+
+    chunks = [specs[i::requests] for i in range(requests)]
+    results = await asyncio.gather(*map(request, chunks))
+    return dict(item for result in results for item in result)
+
+
+async def run_cancel(renderer: AsyncRenderer, specs) -> Tuple[int, int]:
+    """
+    Cancel a request after its first result
+    Returns (results received, specs started) - specs are pulled lazily,
+    so started stays at the concurrency limit if the rest were stopped
+    """
+    received = 0
+    started = 0
+
+    def pull():
+        nonlocal started
+        for spec in specs:
+            started += 1
+            yield spec
+
+    async def request():
+        nonlocal received
+        async for _ in renderer.render_many(pull(), concurrency=2):
+            received += 1
+            await asyncio.sleep(3600)
+
+    task = asyncio.ensure_future(request())
+    while not received:
+        await asyncio.sleep(0.01)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    return received, started
+
+
+async def run(args, expected) -> int:
+    """ Get failed checks over all executors """
+    failed = 0
+    for executor in args.executors:
+        async with AsyncRenderer(executor, jobs=args.jobs) as renderer:
+            start = time.perf_counter()
+            results = await run_requests(renderer, list(expected), 8)
+            elapsed = time.perf_counter() - start
+
+            mismatched = sum(results[spec] != data for spec, data in expected.items())
+            print(f"{executor:8}: {len(results)} renders in {elapsed:6.2f} s", end="")
+            print(f", {mismatched} mismatched")
+
+            received, started = await run_cancel(renderer, list(expected))
+            print(f"{'':8}  cancelled after {received} of {len(expected)}", end="")
+            print(f" renders, {started} started")
+
+            failed += mismatched + (started > 2)
+    return failed
+
+
+def main():
+    argp = argparse.ArgumentParser("async_renders")
+    argp.add_argument("--corpus", default="./icons/svg/*.svg")
+    argp.add_argument("--count", type=int, default=64)
+    argp.add_argument("--size", type=int, default=128)
+    argp.add_argument("--jobs", type=int, default=0)
+    argp.add_argument("--executors", nargs="+", default=["thread", "process"])
+    args = argp.parse_args()
+
+    specs = build_specs(args.corpus, args.count, args.size)
+    expected = {spec: render_bytes(spec) for spec in specs}
+    failed = asyncio.run(run(args, expected))
+    if failed:
+        raise SystemExit(f"{failed} async checks failed")
+
+
+if __name__ == "__main__":
+    main()
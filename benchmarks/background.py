@@ -0,0 +1,81 @@
+# Background Benchmark
+# --------------------
+# Times draw_circle against the per pixel closure it replaced
+# - pixelwise  - get_circle_pixel mapped over every pixel, putdata
+# - vectorized - draw_circle (distance field masks, single frombytes)
+# Both are checked to give identical pixels, speedup is against a cold draw
+
+import time
+import argparse
+
+from PIL import Image  # type: ignore
+from PIL.Image import Image as PILImage  # type: ignore
+
+from icongen.minimal_round import RenderContext, draw_circle
+from icongen.utils import LinearGradient
+
+
+def draw_circle_pixelwise(image: PILImage, context: RenderContext):
+    """ Previous draw_circle, one python call per pixel """
+    w, h = image.width, image.height
+    radius, outline = context.circle_fraction, context.outline_fraction
+
+    _, col1, col2 = context.palette["primary"].split(" ")
+    field = LinearGradient.two_color(col1, col2, 90).calculate_field(w, h)
+
+    def get_circle_pixel(i):
+        y, x = i // w, i % w
+        dist_2 = (x - w / 2) ** 2 + (y - h / 2) ** 2
+
+        # interior
+        rad_2 = (radius * w / 2) ** 2
+        if dist_2 <= rad_2:
+            return tuple(field[y, x].tolist())
+
+        # outline
+        out_2 = (outline * w / 2) ** 2
+        if dist_2 <= out_2:
+            return (255,) * 4
+
+        # exterior
+        return (0, 0, 0, 0)
+
+    circle_pixels = list(map(get_circle_pixel, range(w * h)))
+    image.putdata(circle_pixels)
+
+
+def timed(draw, size: int, context: RenderContext, repeat: int):
+    """ Get best wall time of draw over repeat runs (seconds) and image """
+    times = []
+    for _ in range(repeat):
+        image = Image.new("RGBA", (size, size))
+        start = time.perf_counter()
+        draw(image, context)
+        times.append(time.perf_counter() - start)
+    return min(times), image
+
+
+def main():
+    argp = argparse.ArgumentParser("background")
+    argp.add_argument("--sizes", type=int, nargs="+", default=[512, 1024, 2048])
+    argp.add_argument("--scheme", default="blue")
+    argp.add_argument("--repeat", type=int, default=3)
+    args = argp.parse_args()
+
+    # cold - first draw at a size, builds the memoized masks and gradient field
+    # warm - later draws of the same size reuse them
+    header = f"{'size':>6}{'pixelwise s':>13}{'cold s':>9}{'warm s':>9}"
+    print(f"{header}{'speedup':>9} same")
+    for size in args.sizes:
+        context = RenderContext.create(args.scheme, (size, size), supersample=1)
+        cold, image = timed(draw_circle, size, context, 1)
+        warm, _ = timed(draw_circle, size, context, args.repeat)
+        slow, expected = timed(draw_circle_pixelwise, size, context, 1)
+
+        same = image.tobytes() == expected.tobytes()
+        speedup = slow / cold
+        print(f"{size:6}{slow:13.3f}{cold:9.4f}{warm:9.4f}{speedup:9.1f} {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# Color Parse Benchmark
+# ---------------------
+# Per call cost of parse_color / Color for the strings renders use
+# (palette hex codes) and for every supported notation
+
+import timeit
+import argparse
+
+from icongen.palette import PALETTES
+from icongen.utils import color
+
+NOTATIONS = [
+    "white",
+    "Transparent",
+    "#fff",
+    "#ffff",
+    "#1e90ff",
+    "#1e90ff80",
+    "rebeccapurple",
+    "rgb(30, 144, 255)",
+    "rgba(30, 144, 255, 0.5)",
+    "rgb(12% 56% 100% / 50%)",
+]
+
+
+def palette_strings():
+    """ Get color strings used by renders (palette primary stops, extras) """
+    strings = []
+    for palette in PALETTES.values():
+        strings += palette["primary"].split(" ")[1:]
+        strings.append(palette["extra1"])
+    return strings
+
+
+def per_call(func, strings, number: int, cold: bool) -> float:
+    """ Get best mean cost of func over strings (microseconds per call) """
+    # cold runs clear memoized results before every call
+    cache_clear = getattr(color.parse_color, "cache_clear", None)
+
+    def run():
+        for col in strings:
+            if cold and cache_clear:
+                cache_clear()
+            func(col)
+
+    best = min(timeit.repeat(run, number=number, repeat=5))
+    return best * 1e6 / (number * len(strings))
+
+
+def main():
+    argp = argparse.ArgumentParser("color_parse")
+    argp.add_argument("--number", type=int, default=2000)
+    args = argp.parse_args()
+
+    hot = palette_strings()
+    supported = []
+    for col in NOTATIONS:
+        try:
+            color.parse_color(col)
+            supported.append(col)
+        except ValueError:
+            print(f"unsupported - {col}")
+
+    print(f"{'':24}{'cold':>10}{'warm':>10}  (us/call)")
+    cases = [
+        ("parse_color palette", color.parse_color, hot),
+        ("parse_color notations", color.parse_color, supported),
+        ("Color palette", color.Color, hot),
+    ]
+    for name, func, strings in cases:
+        cold = per_call(func, strings, args.number, cold=True)
+        warm = per_call(func, strings, args.number, cold=False)
+        print(f"{name:24}{cold:10.3f}{warm:10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# Parse Stream Benchmark
+# ----------------------
+# Times and traces memory of parse_svg_file on a large synthetic designer
+# export (metadata, text and gradient subtrees the parser does not support)
+# and on the icons/svg corpus
+
+import os
+import glob
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+
+from svg2png import parser
+
+
+def designer_svg(paths: int, metadata: int, unsupported: int) -> str:
+    """ Get svg source with paths buried between unsupported subtrees """
+    rand = random.Random(0)
+    coord = lambda: f"{rand.uniform(0, 400):.2f} {rand.uniform(0, 400):.2f}"
+
+    meta = "".join(
+        f'<rdf:Description rdf:about="item{i}"><dc:title>title {i}</dc:title>'
+        f"<dc:creator><rdf:Bag><rdf:li>author {i}</rdf:li></rdf:Bag></dc:creator>"
+        "</rdf:Description>"
+        for i in range(metadata)
+    )
+    skipped = "".join(
+        f'<text x="{i}" y="{i}"><tspan>label {i}</tspan></text>'
+        f'<linearGradient id="g{i}"><stop offset="0"/><stop offset="1"/>'
+        "</linearGradient>"
+        for i in range(unsupported)
+    )
+    drawn = "".join(
+        f'<path fill="#ff0000" d="M{coord()} L{coord()} L{coord()} Z"/>'
+        for _ in range(paths)
+    )
+    return (
+        '<?xml version="1.0"?>'
+        '<svg version="1.1" xmlns="http://www.w3.org/2000/svg" '
+        'xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#" '
+        'xmlns:dc="http://purl.org/dc/elements/1.1/" '
+        'viewBox="0 0 400 400" width="400" height="400">'
+        f"<metadata><rdf:RDF>{meta}</rdf:RDF></metadata>"
+        f"<defs>{skipped}</defs><g>{drawn}</g></svg>"
+    )
+
+
+def measure(filenames, repeat: int):
+    """ Get best ms per file and peak traced KiB per file """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for filename in filenames:
+            parser.parse_svg_file(filename, use_cache=False)
+        times.append(time.perf_counter() - start)
+
+    peaks = []
+    for filename in filenames:
+        tracemalloc.start()
+        parser.parse_svg_file(filename, use_cache=False)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    count = len(filenames)
+    return min(times) * 1000 / count, max(peaks) / 1024
+
+
+def main():
+    argp = argparse.ArgumentParser("parse_stream")
+    argp.add_argument("--corpus", default="./icons/svg/*.svg")
+    argp.add_argument("--paths", type=int, default=2000)
+    argp.add_argument("--metadata", type=int, default=40000)
+    argp.add_argument("--unsupported", type=int, default=20000)
+    argp.add_argument("--repeat", type=int, default=3)
+    args = argp.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        large_path = os.path.join(temp_dir, "designer.svg")
+        with open(large_path, "w") as svg_file:
+            svg_file.write(designer_svg(args.paths, args.metadata, args.unsupported))
+        size_mib = os.path.getsize(large_path) / 2 ** 20
+        large_ms, large_peak = measure([large_path], args.repeat)
+
+    filenames = sorted(glob.glob(args.corpus))
+    corpus_ms, corpus_peak = measure(filenames, args.repeat)
+
+    print(f"designer : {size_mib:.1f} MiB, {args.paths} paths")
+    print(f"           {large_ms:10.2f} ms   {large_peak:10.1f} KiB peak")
+    print(f"corpus   : {len(filenames)} icons")
+    print(f"           {corpus_ms:10.2f} ms/icon {corpus_peak:8.1f} KiB peak (max)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# Path Geometry Benchmark
+# -----------------------
+# Times and traces memory of building and drawing every icon in icons/svg
+
+import glob
+import time
+import argparse
+import tracemalloc
+
+from PIL import Image  # type: ignore
+
+from svg2png import parser
+
+
+def main():
+    argp = argparse.ArgumentParser("path_geometry")
+    argp.add_argument("--corpus", default="./icons/svg/*.svg")
+    argp.add_argument("--size", type=int, default=1024)
+    args = argp.parse_args()
+
+    filenames = sorted(glob.glob(args.corpus))
+    canvas = (args.size, args.size)
+    bbox = (0, 0, args.size, args.size)
+
+    # time (without tracing overhead)
+    parse_time = draw_time = 0.0
+    for filename in filenames:
+        start = time.perf_counter()
+        store = parser.parse_svg_file(filename, use_cache=False)
+        parse_time += time.perf_counter() - start
+
+        image = Image.new("RGBA", canvas)
+        start = time.perf_counter()
+        store.draw_all(image, bbox)
+        draw_time += time.perf_counter() - start
+
+    # peak python memory per icon (image buffer excluded)
+    peaks = []
+    for filename in filenames:
+        image = Image.new("RGBA", canvas)
+        tracemalloc.start()
+        store = parser.parse_svg_file(filename, use_cache=False)
+        store.draw_all(image, bbox)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    count = len(filenames)
+    print(f"corpus   : {count} icons at {args.size}px")
+    print(f"parse    : {parse_time * 1000 / count:8.2f} ms/icon")
+    print(f"draw     : {draw_time * 1000 / count:8.2f} ms/icon")
+    print(f"peak mem : {sum(peaks) / count / 1024:8.1f} KiB/icon (mean)")
+    print(f"           {max(peaks) / 1024:8.1f} KiB/icon (max)")
+
+
+if __name__ == "__main__":
+    main()
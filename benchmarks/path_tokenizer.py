@@ -0,0 +1,53 @@
+# Path Tokenizer Benchmark
+# ------------------------
+# Times parse_svg_path over every <path> in icons/svg
+
+import glob
+import time
+import argparse
+import xml.etree.ElementTree as elemtree
+
+from svg2png import parser, vector
+
+
+def corpus_paths(pattern: str) -> list:
+    """ Collect all path command strings from svg files """
+    commands = []
+    for filename in sorted(glob.glob(pattern)):
+        for elem in elemtree.parse(filename).iter():
+            if elem.tag.endswith("path") and "d" in elem.attrib:
+                commands.append(elem.attrib["d"])
+    return commands
+
+
+def main():
+    argp = argparse.ArgumentParser("path_tokenizer")
+    argp.add_argument("--corpus", default="./icons/svg/*.svg")
+    argp.add_argument("--repeat", type=int, default=20)
+    args = argp.parse_args()
+
+    commands = corpus_paths(args.corpus)
+    total_chars = sum(map(len, commands))
+
+    # tokenize only
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for command_str in commands:
+            for _ in parser.tokenize_svg_path(command_str):
+                pass
+    tokenize_time = (time.perf_counter() - start) / args.repeat
+
+    # tokenize + build path
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for command_str in commands:
+            parser.parse_svg_path(command_str, vector.DrawablePath(""))
+    parse_time = (time.perf_counter() - start) / args.repeat
+
+    print(f"corpus   : {len(commands)} paths, {total_chars} chars")
+    print(f"tokenize : {tokenize_time * 1000:8.2f} ms")
+    print(f"parse    : {parse_time * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# Rasterizer Benchmark
+# --------------------
+# Compares draw_all backends over icons/svg at several output sizes
+# - polygon  - drawn at supersample x size, bicubic downscale (render default)
+# - coverage - drawn anti-aliased at output size
+# Error is mean / max absolute alpha difference (0-255) against a polygon
+# reference drawn at 16x and box filtered down (close to exact coverage)
+
+import glob
+import time
+import argparse
+from typing import Callable, List
+
+import numpy as np  # type: ignore
+from PIL import Image  # type: ignore
+
+from svg2png import parser
+from svg2png.vector import DrawableObjectStore, POLYGON, COVERAGE
+
+REFERENCE_SUPERSAMPLE = 16
+
+
+def draw_polygon(store: DrawableObjectStore, size: int, scale: int, resample: int):
+    """ Draw svg layer at size * scale and downscale it to size """
+    canvas = size * scale
+    image = Image.new("RGBA", (canvas, canvas))
+    store.draw_all(image, (0, 0, canvas, canvas), backend=POLYGON)
+    return image.resize((size, size), resample=resample)
+
+
+def draw_coverage(store: DrawableObjectStore, size: int):
+    """ Draw svg layer at size with coverage backend """
+    image = Image.new("RGBA", (size, size))
+    return store.draw_all(image, (0, 0, size, size), backend=COVERAGE)
+
+
+def alpha(image) -> np.ndarray:
+    return np.asarray(image)[..., 3].astype(np.int16)
+
+
+def timed(func: Callable[[], None], repeat: int) -> float:
+    """ Get best wall time of func over repeat runs (seconds) """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def bench_size(stores: List[DrawableObjectStore], size: int, args) -> dict:
+    """ Get ms per icon and alpha error of both backends at size """
+    poly_time = cov_time = 0.0
+    poly_err, cov_err, poly_max, cov_max = [], [], 0, 0
+
+    for store in stores:
+        poly_time += timed(
+            lambda: draw_polygon(store, size, args.supersample, Image.BICUBIC),
+            args.repeat,
+        )
+        cov_time += timed(lambda: draw_coverage(store, size), args.repeat)
+
+        reference = alpha(draw_polygon(store, size, REFERENCE_SUPERSAMPLE, Image.BOX))
+        polygon = draw_polygon(store, size, args.supersample, Image.BICUBIC)
+        poly_diff = np.abs(alpha(polygon) - reference)
+        cov_diff = np.abs(alpha(draw_coverage(store, size)) - reference)
+        poly_err.append(poly_diff.mean())
+        cov_err.append(cov_diff.mean())
+        poly_max = max(poly_max, int(poly_diff.max()))
+        cov_max = max(cov_max, int(cov_diff.max()))
+
+    count = len(stores)
+    return {
+        "polygon": (poly_time * 1000 / count, np.mean(poly_err), poly_max),
+        "coverage": (cov_time * 1000 / count, np.mean(cov_err), cov_max),
+    }
+
+
+def main():
+    argp = argparse.ArgumentParser("rasterizer")
+    argp.add_argument("--corpus", default="./icons/svg/*.svg")
+    argp.add_argument("--sizes", type=int, nargs="+", default=[32, 128, 512])
+    argp.add_argument("--supersample", type=int, default=2)
+    argp.add_argument("--repeat", type=int, default=3)
+    args = argp.parse_args()
+
+    filenames = sorted(glob.glob(args.corpus))
+    stores = [parser.parse_svg_file(name) for name in filenames]
+
+    print(f"corpus: {len(filenames)} icons, polygon at {args.supersample}x")
+    print(f"{'size':>6} {'backend':10}{'ms/icon':>10}{'mean err':>10}{'max err':>9}")
+    for size in args.sizes:
+        results = bench_size(stores, size, args)
+        for backend, (ms, mean_err, max_err) in results.items():
+            print(f"{size:6} {backend:10}{ms:10.2f}{mean_err:10.3f}{max_err:9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+# Render Stages Benchmark
+# -----------------------
+# Times each stage of render_svg on its own over icons/svg at several sizes
+# Results are written as json and can be checked against a baseline run
+
+# python -m benchmarks.render_stages --output base.json
+# python -m benchmarks.render_stages --compare base.json --threshold 0.1
+
+import io
+import sys
+import glob
+import json
+import time
+import argparse
+import platform
+from typing import Callable, Dict, List
+
+import numpy as np  # type: ignore
+import PIL  # type: ignore
+from PIL import Image  # type: ignore
+
+from svg2png import parser
+from icongen import minimal_round
+from icongen.utils import BBox
+
+
+STAGES = [
+    "parse",
+    "parse_cached",
+    "draw_all",
+    "draw_circle",
+    "remap",
+    "alpha_composite",
+    "resize",
+    "png_save",
+]
+
+
+def best_of(repeat: int, func: Callable[[], None]) -> float:
+    """ Get best wall time of func over repeat runs (seconds) """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def bench_size(filenames: List[str], size: int, repeat: int) -> Dict[str, float]:
+    """ Get mean ms per icon of every stage at output size """
+    context = minimal_round.RenderContext.create("blue", (size, size))
+    canvas = context.canvas_size
+    svg_bb = tuple(BBox(canvas).get_sub_bbox(context.svg_fraction))
+    cmap = minimal_round.ColorMap(context.palette)
+
+    # stage inputs, each stage times only its own work
+    stores = [parser.parse_svg_file(name) for name in filenames]
+    drawn = []
+    for store in stores:
+        svg_im = Image.new("RGBA", canvas)
+        store.draw_all(svg_im, svg_bb)
+        drawn.append(svg_im)
+    pixels = [np.asarray(svg_im) for svg_im in drawn]
+    background = Image.new("RGBA", canvas)
+    minimal_round.draw_circle(background, context)
+    composed = [background.copy() for _ in drawn]
+    for surface_im, svg_im in zip(composed, drawn):
+        surface_im.alpha_composite(svg_im)
+    finals = [im.resize(context.size, resample=Image.BICUBIC) for im in composed]
+
+    def parse():
+        for name in filenames:
+            parser.parse_svg_file(name, use_cache=False)
+
+    def parse_cached():
+        for name in filenames:
+            parser.parse_svg_file(name)
+
+    def draw_all():
+        for store in stores:
+            store.draw_all(Image.new("RGBA", canvas), svg_bb)
+
+    def draw_circle():
+        for _ in filenames:
+            minimal_round.draw_circle(Image.new("RGBA", canvas), context)
+
+    def remap():
+        for svg_pixels in pixels:
+            cmap.remap_array(svg_pixels)
+
+    def alpha_composite():
+        for svg_im in drawn:
+            background.copy().alpha_composite(svg_im)
+
+    def resize():
+        for surface_im in composed:
+            surface_im.resize(context.size, resample=Image.BICUBIC)
+
+    def png_save():
+        for final_im in finals:
+            final_im.save(io.BytesIO(), "PNG")
+
+    stage_funcs = {
+        "parse": parse,
+        "parse_cached": parse_cached,
+        "draw_all": draw_all,
+        "draw_circle": draw_circle,
+        "remap": remap,
+        "alpha_composite": alpha_composite,
+        "resize": resize,
+        "png_save": png_save,
+    }
+    count = len(filenames)
+    return {
+        stage: best_of(repeat, stage_funcs[stage]) * 1000 / count for stage in STAGES
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> List[str]:
+    """ Get regressions (stages slower than baseline by more than threshold) """
+    regressions = []
+    for size, stages in results["sizes"].items():
+        for stage, ms in stages.items():
+            base_ms = baseline["sizes"].get(size, {}).get(stage)
+            if base_ms and ms > base_ms * (1 + threshold):
+                ratio = ms / base_ms
+                regressions.append(
+                    f"{stage}@{size}: {base_ms:.2f} -> {ms:.2f} ms ({ratio:.2f}x)"
+                )
+    return regressions
+
+
+def main():
+    argp = argparse.ArgumentParser("render_stages")
+    argp.add_argument("--corpus", default="./icons/svg/*.svg")
+    argp.add_argument("--sizes", type=int, nargs="+", default=[64, 256, 512])
+    argp.add_argument("--repeat", type=int, default=3)
+    argp.add_argument("--output", help="write results json")
+    argp.add_argument("--compare", help="baseline results json")
+    argp.add_argument("--threshold", type=float, default=0.1)
+    args = argp.parse_args()
+
+    filenames = sorted(glob.glob(args.corpus))
+    results = {
+        "env": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pillow": PIL.__version__,
+            "machine": platform.machine(),
+        },
+        "corpus": len(filenames),
+        "repeat": args.repeat,
+        "sizes": {},
+    }
+
+    print(f"corpus: {len(filenames)} icons, ms/icon (best of {args.repeat})")
+    print(f"{'stage':16}" + "".join(f"{size:>10}" for size in args.sizes))
+    for size in args.sizes:
+        results["sizes"][str(size)] = bench_size(filenames, size, args.repeat)
+    for stage in STAGES:
+        row = (results["sizes"][str(size)][stage] for size in args.sizes)
+        print(f"{stage:16}" + "".join(f"{ms:10.2f}" for ms in row))
+
+    if args.output:
+        with open(args.output, "w") as out_file:
+            json.dump(results, out_file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as base_file:
+            baseline = json.load(base_file)
+        regressions = compare(results, baseline, args.threshold)
+        for line in regressions:
+            print(f"regression - {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions over {args.threshold:.0%} against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
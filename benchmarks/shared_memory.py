@@ -0,0 +1,70 @@
+# Shared Memory Benchmark
+# -----------------------
+# Compares getting raw rgba renders back from worker processes
+# - pickled - worker returns pixel array, pickled through the pool's pipe
+# - shm     - SharedImagePool, pixels stay in pooled shared memory blocks
+# Parent cpu time is the cost of receiving results (renders run in workers)
+
+import glob
+import time
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np  # type: ignore
+from PIL import Image  # type: ignore
+
+from icongen import minimal_round
+from icongen.stream import RenderSpec
+from icongen.shm import SharedImagePool
+
+
+def render_pixels(spec: RenderSpec) -> np.ndarray:
+    """ Render spec to rgba array (runs inside worker) """
+    size = (spec.size, spec.size)
+    return np.asarray(minimal_round.render_svg(spec.svg_path, size, spec.color))
+
+
+def run_pickled(specs, jobs: int) -> int:
+    checksum = 0
+    with ProcessPoolExecutor(jobs) as executor:
+        for pixels in executor.map(render_pixels, specs):
+            image = Image.fromarray(pixels)
+            center = (image.width // 2, image.height // 2)
+            checksum += image.getpixel(center)[0]  # type: ignore
+    return checksum
+
+
+def run_shm(specs, jobs: int) -> int:
+    checksum = 0
+    with SharedImagePool(jobs) as pool:
+        for _, image in pool.render_images(specs):
+            center = (image.width // 2, image.height // 2)
+            checksum += image.getpixel(center)[0]  # type: ignore
+    return checksum
+
+
+def main():
+    argp = argparse.ArgumentParser("shared_memory")
+    argp.add_argument("--corpus", default="./icons/svg/*.svg")
+    argp.add_argument("--sizes", type=int, nargs="+", default=[512, 1024])
+    argp.add_argument("--count", type=int, default=40)
+    argp.add_argument("--jobs", type=int, default=2)
+    args = argp.parse_args()
+
+    filenames = itertools.cycle(sorted(glob.glob(args.corpus)))
+    print(f"{args.count} renders per size on {args.jobs} workers")
+    print(f"{'size':>6} {'mode':8}{'wall s':>9}{'parent cpu ms':>15}{'ms/image':>10}")
+    for size in args.sizes:
+        specs = [RenderSpec(next(filenames), "blue", size) for _ in range(args.count)]
+        for mode, run in (("pickled", run_pickled), ("shm", run_shm)):
+            wall, cpu = time.perf_counter(), time.process_time()
+            run(specs, args.jobs)
+            wall = time.perf_counter() - wall
+            cpu = (time.process_time() - cpu) * 1000
+            per_image = cpu / args.count
+            print(f"{size:6} {mode:8}{wall:9.2f}{cpu:15.1f}{per_image:10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# Thread Stress Harness
+# ---------------------
+# Renders icons/svg from many threads at once, in shuffled order,
+# and checks every result is byte identical to a serial render
+
+import glob
+import time
+import random
+import argparse
+import itertools
+
+from icongen.palette import PALETTES
+from icongen.stream import RenderSpec, render_bytes, render_many
+
+
+def main():
+    argp = argparse.ArgumentParser("thread_stress")
+    argp.add_argument("--corpus", default="./icons/svg/*.svg")
+    argp.add_argument("--size", type=int, default=64)
+    argp.add_argument("--threads", type=int, default=16)
+    argp.add_argument("--rounds", type=int, default=3)
+    args = argp.parse_args()
+
+    filenames = sorted(glob.glob(args.corpus))
+    specs = [
+        RenderSpec(svg_path, color, args.size)
+        for svg_path, color in itertools.product(filenames, sorted(PALETTES))
+    ]
+    # every size of icns too (mixed supersample factors per render)
+    specs += [RenderSpec(svg_path, "blue", format="icns") for svg_path in filenames]
+
+    start = time.perf_counter()
+    expected = {spec: render_bytes(spec) for spec in specs}
+    serial_time = time.perf_counter() - start
+    print(f"serial   : {len(specs)} renders in {serial_time:6.2f} s")
+
+    rng = random.Random(0)
+    mismatched = 0
+    for round_no in range(args.rounds):
+        # shuffle so neighbouring renders use different palettes and sizes
+        order = specs[:]
+        rng.shuffle(order)
+
+        start = time.perf_counter()
+        results = render_many(order, jobs=args.threads, threads=True)
+        round_mismatched = sum(expected[spec] != data for spec, data in results)
+        elapsed = time.perf_counter() - start
+
+        mismatched += round_mismatched
+        print(f"round {round_no}  : {len(specs)} renders in {elapsed:6.2f} s", end="")
+        print(f" on {args.threads} threads, {round_mismatched} mismatched")
+
+    if mismatched:
+        raise SystemExit(f"{mismatched} threaded renders differ from serial")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,53 +3,80 @@ import shutil
 import platform
 import argparse
 import contextlib
-import subprocess
 
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import Executor, Future
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from PIL import Image  # type: ignore
+
+from icongen import icns
 from icongen import iconpaths
 from icongen import minimal_round
+from icongen.cache import RenderCache
+from svg2png import instrument
+from svg2png import vector
 
 
 class DarwinGenerator:
+
+    # highest res png rendered for each icon
+    RENDER_SIZE = 512
+
     @classmethod
-    def create_icns(cls, png_path: str, icn_path: str):
+    def render_icon(
+        cls,
+        svg_path: str,
+        color: str,
+        png_path: Optional[str],
+        icn_path: Optional[str],
+        profile: bool = False,
+    ) -> Optional[dict]:
         """
-        Create icns file from highres png file
-        Throws AssertionError if icns is not created successfully
+        Render png and / or icns file from svg (runs inside worker)
+        Every icns size is rendered natively, svg is parsed once
+        Returns stage timings and counters report if profile is set
         """
+        recording = instrument.recording() if profile else contextlib.nullcontext()
+        with recording as recorder:
+            sizes = [cls.RENDER_SIZE] + (icns.icns_sizes() if icn_path else [])
+            images = minimal_round.render_svg_sizes(svg_path, sizes, color)
+            master = images[cls.RENDER_SIZE]
 
-        # create fresh iconset folder (intermediate)
-        iconset_path = ".".join(icn_path.split(".")[:-1]) + ".iconset"
-        if os.path.exists(iconset_path):
-            shutil.rmtree(iconset_path)
-        os.makedirs(iconset_path)
-
-        # resize png to different resolutions using sips
-        sips_cmd = f"sips -z <r1> {png_path} --out {iconset_path}/icon_<r2>.png"
-        for res in [16, 32, 128, 256]:
-            # 1x res
-            command = sips_cmd.replace("<r1>", f"{res} {res}")
-            command = command.replace("<r2>", f"{res}x{res}")
-            subprocess.call(command.split(), stdout=subprocess.DEVNULL)
-            # 2x res
-            command = sips_cmd.replace("<r1>", f"{res*2} {res*2}")
-            command = command.replace("<r2>", f"{res}x{res}@2x")
-            subprocess.call(command.split(), stdout=subprocess.DEVNULL)
-
-        # create icns file from iconset
-        iconutil_cmd = f"iconutil -c icns {iconset_path}"
-        subprocess.call(iconutil_cmd.split(), stdout=subprocess.DEVNULL)
-        assert os.path.exists(icn_path), "icns not created"
-
-        # cleanup iconset
-        shutil.rmtree(iconset_path)
+            with instrument.stage("encode"):
+                if png_path:
+                    master.save(png_path, "PNG")
+                if icn_path:
+                    icns.write_icns(master, icn_path, images)
+
+        return recorder.report() if recorder else None
 
     @classmethod
-    def generate_all(cls, replace=False):
-        """ Generate icons and replace original """
+    def generate_all(
+        cls,
+        replace=False,
+        jobs=1,
+        use_cache=True,
+        clear_cache=False,
+        keep_icns=False,
+        threads=False,
+        profile=False,
+    ):
+        """
+        Generate icons and replace original
+        keep_icns writes icns files to output instead of replacing
+        jobs > 1 renders on a process pool, jobs = 0 uses all cores
+        threads renders on a thread pool instead
+        profile prints per icon stage timings, slowest first
+        unchanged renders are reused from cache unless use_cache=False
+        """
+
+        render_size = cls.RENDER_SIZE
 
         # output dir configuration
         outimg = f"./output/png"
         outico = f"./output/icns"
+        outcache = f"./output/cache"
 
         # create output dirs
         orig_umask = os.umask(0)
@@ -57,48 +84,226 @@ class DarwinGenerator:
         os.makedirs(outico, exist_ok=True)
         os.umask(orig_umask)
 
+        # render cache
+        cache: Optional[RenderCache] = RenderCache(outcache)
+        if clear_cache:
+            cache.clear()
+        if not use_cache:
+            cache = None
+
+        # skip if destination path doesnt exist
         icon_list = iconpaths.darwin_package_list()
-        for i, pack_meta in enumerate(icon_list):
+        icon_list = [x for x in icon_list if not x["dest"] or os.path.exists(x["dest"])]
+
+        # renders that also need an icns
+        icns_keys = set(
+            (x["svg"], x["color"], render_size)
+            for x in icon_list
+            if keep_icns or (replace and x["dest"])
+        )
+
+        # render parameters (part of cache keys)
+        supersample = (minimal_round.DEFAULT_SUPERSAMPLE, minimal_round.SUPERSAMPLE)
+        flatness = vector.DEFAULT_FLATNESS
+        png_params = dict(
+            sizes=[render_size], supersample=supersample, flatness=flatness
+        )
+        icns_params = dict(
+            sizes=icns.icns_sizes(), supersample=supersample, flatness=flatness
+        )
+
+        # background layers are shared through cache dir too
+        bg_cache_dir = f"{outcache}/background" if cache else None
+        init_worker = minimal_round.set_background_cache_dir
+
+        # single worker thread keeps serial rendering in this process
+        executor: Executor
+        if jobs == 1 or threads:
+            executor = ThreadPoolExecutor(
+                jobs or os.cpu_count(),
+                initializer=init_worker,
+                initargs=(bg_cache_dir,),
+            )
+        else:
+            executor = ProcessPoolExecutor(
+                jobs or None, initializer=init_worker, initargs=(bg_cache_dir,)
+            )
 
-            dest_path = pack_meta["dest"]
+        # schedule each unique render once (in pack order)
+        renders: Dict[Tuple[str, str, int], Future] = {}
+        uncached: Dict[Tuple[str, str, int], List[Tuple[str, str, str]]] = {}
+        for pack_meta in icon_list:
             svg_name = pack_meta["svg"]
             color_scheme = pack_meta["color"]
 
-            # skip if destination path doesnt exist
-            if dest_path and not os.path.exists(dest_path):
+            render_key = (svg_name, color_scheme, render_size)
+            if render_key in renders:
                 continue
 
             svg_path = f"./icons/svg/{svg_name}.svg"
-            png_path = f"{outimg}/{svg_name}.png"
-            icn_path = f"{outico}/{svg_name}.icns"
-
-            # render png image for highest res
-            if not os.path.isfile(png_path):
-                image = minimal_round.render_svg(svg_path, (512, 512), color_scheme)
-                image.save(png_path, "PNG")
-
-            # create and replace icns
-            if replace and dest_path:
-                cls.create_icns(png_path, icn_path)
-                shutil.move(icn_path, dest_path)
-
-            # progress bar
-            outstr = dest_path if replace else f"{svg_name}@{color_scheme}"
-            print(outstr, " " * (40 - len(outstr)))
-            prog = int((i + 1) * 20 / len(icon_list))
-            prog_bar = "=" * prog + " " * (20 - prog)
-            print(f"[{prog_bar}] {prog*5}%", end="\r")
+            outputs = {"png": (f"{outimg}/{svg_name}@{color_scheme}.png", png_params)}
+            if render_key in icns_keys:
+                icn_path = f"{outico}/{svg_name}@{color_scheme}.icns"
+                outputs["icns"] = (icn_path, icns_params)
+
+            # reuse cached outputs if svg, palette and params are unchanged
+            renders[render_key] = future = Future()
+            missing: Dict[str, str] = {}
+            try:
+                for ext, (out_path, params) in outputs.items():
+                    cached_path = None
+                    if cache:
+                        cache_key = cache.key(svg_path, color_scheme, **params)
+                        cached_path = cache.get(cache_key, ext)
+                    if cached_path:
+                        shutil.copyfile(cached_path, out_path)
+                    else:
+                        missing[ext] = out_path
+                        if cache:
+                            uncached.setdefault(render_key, [])
+                            uncached[render_key].append((cache_key, out_path, ext))
+            except OSError as err:
+                future.set_exception(err)
+                continue
+
+            if not missing:
+                future.set_result(None)
+                continue
+
+            # render png (and icns) image for highest res
+            renders[render_key] = executor.submit(
+                cls.render_icon,
+                svg_path,
+                color_scheme,
+                missing.get("png"),
+                missing.get("icns"),
+                profile,
+            )
+
+        # consume results in pack order -> deterministic output
+        failed: List[Tuple[str, Exception]] = []
+        reports: Dict[Tuple[str, str, int], Tuple[str, dict]] = {}
+        with executor:
+            for i, pack_meta in enumerate(icon_list):
+
+                dest_path = pack_meta["dest"]
+                svg_name = pack_meta["svg"]
+                color_scheme = pack_meta["color"]
+
+                icn_path = f"{outico}/{svg_name}@{color_scheme}.icns"
+                outstr = dest_path if replace else f"{svg_name}@{color_scheme}"
+
+                # collect failure and move on to next icon
+                try:
+                    render_key = (svg_name, color_scheme, render_size)
+                    report = renders[render_key].result()
+                    if report:
+                        reports[render_key] = (f"{svg_name}@{color_scheme}", report)
+
+                    # store fresh renders
+                    if cache:
+                        for cache_key, out_path, ext in uncached.pop(render_key, []):
+                            cache.put(cache_key, out_path, ext)
+
+                    # replace icns
+                    if replace and dest_path:
+                        shutil.copyfile(icn_path, dest_path)
+
+                except Exception as err:
+                    failed.append((outstr, err))
+                    outstr = f"{outstr} [failed]"
+
+                # progress bar
+                print(outstr, " " * (40 - len(outstr)))
+                prog = int((i + 1) * 20 / len(icon_list))
+                prog_bar = "=" * prog + " " * (20 - prog)
+                print(f"[{prog_bar}] {prog*5}%", end="\r")
+
+        # end progress bar line
+        print()
+
+        # keep cache within size bound
+        if cache:
+            cache.evict()
+            print(cache.stats())
+
+        # stage timings of rendered icons
+        if profile:
+            cls.print_profile(list(reports.values()))
+
+        # report failures
+        if failed:
+            print(f"{len(failed)} of {len(icon_list)} icons failed")
+            for outstr, error in failed:
+                print(f"  {outstr}: {type(error).__name__}: {error}")
+
+        # icns were only needed for replacing
+        if not keep_icns:
+            for svg_name, color_scheme, _ in icns_keys:
+                with contextlib.suppress(OSError):
+                    os.remove(f"{outico}/{svg_name}@{color_scheme}.icns")
 
         # remove icns if empty
         with contextlib.suppress(OSError):
             os.rmdir(outico)
 
+    @staticmethod
+    def print_profile(reports: List[Tuple[str, dict]]):
+        """ Print stage timings (ms) and counters table, slowest icons first """
+        if not reports:
+            print("profile: no icons rendered (all cached)")
+            return
+
+        stages = ["parse", "background", "draw", "remap", "composite", "resize"]
+        stages.append("encode")
+        counters = ["drawables", "vertices", "remapped_pixels"]
+
+        def total(item):
+            return sum(item[1]["stages"].values())
+
+        header = f"{'icon':24}{'total':>9}" + "".join(f"{x[:9]:>10}" for x in stages)
+        header += f"{'paths':>7}{'verts':>9}{'remapped':>10}{'peak MiB':>10}"
+        print(header)
+        for name, report in sorted(reports, key=total, reverse=True):
+            times = report["stages"]
+            counts = report["counters"]
+            row = f"{name[:23]:24}{sum(times.values()):9.1f}"
+            row += "".join(f"{times.get(stage, 0.0):10.1f}" for stage in stages)
+            row += "".join(
+                f"{counts.get(counter, 0):{width}d}"
+                for counter, width in zip(counters, (7, 9, 10))
+            )
+            row += f"{counts.get('peak_image_bytes', 0) / 2 ** 20:10.1f}"
+            print(row)
+
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser("icongen")
     parser.add_argument(
         "--replace", action="store_true", help="replace icon files [sudo]"
     )
+    parser.add_argument(
+        "--icns", action="store_true", help="also write icns files to output"
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="render icons on N processes (0 for all cores)",
+    )
+    parser.add_argument(
+        "--threads", action="store_true", help="use threads instead of processes"
+    )
+    parser.add_argument(
+        "--profile", action="store_true", help="print per icon stage timings"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="always render, skip render cache"
+    )
+    parser.add_argument(
+        "--clear-cache", action="store_true", help="empty render cache before run"
+    )
     return parser.parse_args()
 
 
@@ -106,13 +311,13 @@ def main():
 
     SUPPORTED_PLATFORMS = ["Darwin"]
 
-    # check platform for early fail
-    if platform.system() not in SUPPORTED_PLATFORMS:
-        exit("This platform is not currently supported :(")
-
     # parse arguments
     args = parse_args()
 
+    # check platform for early fail (only replacing is platform specific)
+    if args.replace and platform.system() not in SUPPORTED_PLATFORMS:
+        exit("This platform is not currently supported :(")
+
     # check permission for early fail
     if args.replace and os.geteuid() != 0:
         print("Admin privileges are required to overwrite system files")
@@ -120,7 +325,15 @@ def main():
         exit()
 
     # forward to platform specific handler
-    DarwinGenerator.generate_all(replace=args.replace)
+    DarwinGenerator.generate_all(
+        replace=args.replace,
+        jobs=args.jobs,
+        use_cache=not args.no_cache,
+        clear_cache=args.clear_cache,
+        keep_icns=args.icns,
+        threads=args.threads,
+        profile=args.profile,
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,3 @@
+from .stream import RenderSpec, render_many
+from .aio import AsyncRenderer
+from .shm import SharedImagePool
@@ -0,0 +1,106 @@
+# Async Renderer
+# --------------
+# asyncio front end for embedding the renderer in servers and pipelines
+# cpu work runs on an executor, the event loop only schedules and awaits
+
+from typing import AsyncIterator, Dict, Iterable, Optional, Tuple
+
+import os
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from .stream import RenderSpec, render_bytes
+
+
+class AsyncRenderer:
+    """
+    Async Renderer
+    --------------
+    - executor    - "process", "thread" or an Executor instance
+    - jobs        - workers for created executors (0 = all cores)
+    - concurrency - default renders in flight per call (see render_many)
+    - executors created here are shut down by close / async with
+    - cancelling an awaiting task cancels renders not yet started,
+      running renders finish in the worker and their result is dropped
+    """
+
+    def __init__(self, executor="process", jobs: int = 0, concurrency: int = 0):
+        workers = jobs or os.cpu_count() or 1
+
+        self._owns_executor = not isinstance(executor, Executor)
+        if executor == "process":
+            executor = ProcessPoolExecutor(workers)
+        elif executor == "thread":
+            executor = ThreadPoolExecutor(workers)
+        elif self._owns_executor:
+            raise ValueError(f"unsupported executor - {executor}")
+
+        self.executor: Executor = executor
+        self.concurrency = concurrency or 2 * workers
+
+    async def __aenter__(self) -> "AsyncRenderer":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """ Shut down owned executor without blocking the loop """
+        if self._owns_executor:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self.executor.shutdown)
+
+    async def render(self, spec: RenderSpec) -> bytes:
+        """ Render spec to encoded png / icns bytes """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, render_bytes, spec)
+
+    async def render_to_file(self, spec: RenderSpec, out_path: str):
+        """ Render spec and write it to out_path (written off the loop) """
+        data = await self.render(spec)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, _write_file, out_path, data)
+
+    async def render_many(
+        self, specs: Iterable[RenderSpec], concurrency: Optional[int] = None
+    ) -> AsyncIterator[Tuple[RenderSpec, bytes]]:
+        """
+        Render specs and yield (spec, image_bytes) in completion order
+        ---------------------------------------------------------------
+        - concurrency - renders in flight for this call only, so one large
+          request can not starve others sharing the executor
+        - first failing render raises, remaining renders are cancelled
+        - closing the generator early (break / aclose) cancels the rest
+        """
+        limit = concurrency or self.concurrency
+        spec_iter = iter(specs)
+        in_flight: Dict[asyncio.Future, RenderSpec] = {}
+
+        try:
+            while True:
+                # top up to limit, specs pulled lazily
+                while len(in_flight) < limit:
+                    spec = next(spec_iter, None)
+                    if spec is None:
+                        break
+                    in_flight[asyncio.ensure_future(self.render(spec))] = spec
+
+                if not in_flight:
+                    break
+
+                done, _ = await asyncio.wait(
+                    in_flight, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    yield in_flight.pop(task), task.result()
+
+        finally:
+            for task in in_flight:
+                task.cancel()
+            if in_flight:
+                await asyncio.gather(*in_flight, return_exceptions=True)
+
+
+def _write_file(path: str, data: bytes):
+    with open(path, "wb") as out_file:
+        out_file.write(data)
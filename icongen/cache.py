@@ -0,0 +1,105 @@
+# Render Cache
+# ------------
+# Persistent content addressed store for rendered icons
+
+from typing import Optional
+
+import os
+import json
+import shutil
+import hashlib
+import threading
+
+from . import minimal_round
+from .palette import PALETTES
+
+
+# bump when renderer output changes for the same inputs
+CACHE_VERSION = 8
+
+
+class RenderCache:
+    """
+    Render Cache
+    ------------
+    - entries keyed by hash of svg bytes, palette, render params and design
+    - stored as files (png, icns, ..) inside cache_dir
+    - size bounded, least recently used entries evicted first
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 100 * 2 ** 20):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+        # statistics
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, svg_path: str, color_scheme: str, **render_params) -> str:
+        """
+        Get cache key for render inputs
+        render_params - json serializable (size, supersample, ..)
+        """
+        with open(svg_path, "rb") as svg_file:
+            svg_bytes = svg_file.read()
+
+        params = {
+            "version": CACHE_VERSION,
+            "palette": PALETTES[color_scheme],
+            "render": render_params,
+            "design": minimal_round.DESIGN_PARAMS,
+        }
+        params_bytes = json.dumps(params, sort_keys=True).encode()
+
+        hasher = hashlib.sha256(svg_bytes)
+        hasher.update(params_bytes)
+        return hasher.hexdigest()
+
+    def _entry_path(self, key: str, ext: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.{ext}")
+
+    def get(self, key: str, ext="png") -> Optional[str]:
+        """
+        Get path of cached file for key, None if not cached
+        Marks entry as recently used
+        """
+        path = self._entry_path(key, ext)
+        if not os.path.isfile(path):
+            self.misses += 1
+            return None
+
+        os.utime(path)
+        self.hits += 1
+        return path
+
+    def put(self, key: str, src_path: str, ext="png"):
+        """ Store copy of rendered file under key """
+        path = self._entry_path(key, ext)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        shutil.copyfile(src_path, temp_path)
+        os.replace(temp_path, path)
+
+    def evict(self):
+        """ Remove least recently used entries until within size bound """
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+    def clear(self):
+        """ Remove all cached entries """
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def stats(self) -> str:
+        return f"cache: {self.hits} hits, {self.misses} misses"
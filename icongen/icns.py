@@ -0,0 +1,93 @@
+# ICNS Encoder
+# ------------
+# Writes apple icon container directly from a master image
+# No iconset folder, sips or iconutil needed (works on any platform)
+
+# icns
+# ├─ header - "icns" + total length
+# ├─ TOC    - type + length of every chunk
+# └─ chunks - type + length + png data
+
+from typing import Dict, List, Optional, Tuple
+
+import io
+import struct
+
+from PIL import Image  # type: ignore
+from PIL.Image import Image as PILImage  # type: ignore
+
+
+# chunk type -> pixel size, same set iconutil builds from an iconset
+# (icp4 / icp5 are the png variants of the 16 and 32 px slots)
+ICNS_CHUNKS: List[Tuple[bytes, int]] = [
+    (b"icp4", 16),
+    (b"ic11", 32),  # 16@2x
+    (b"icp5", 32),
+    (b"ic12", 64),  # 32@2x
+    (b"ic07", 128),
+    (b"ic13", 256),  # 128@2x
+    (b"ic08", 256),
+    (b"ic14", 512),  # 256@2x
+]
+
+HEADER_SIZE = 8
+
+
+def encode_png_sizes(
+    image: PILImage, sizes: List[int], sized_images: Optional[Dict[int, PILImage]]
+) -> Dict[int, bytes]:
+    """
+    Encode image as png at each unique size
+    Uses natively rendered sized_images where given, else resizes image once
+    """
+    sized_images = sized_images or {}
+
+    png_data = {}
+    for size in sorted(set(sizes)):
+        resized = sized_images.get(size, image)
+        if resized.size != (size, size):
+            resized = image.resize((size, size), resample=Image.LANCZOS)
+
+        buffer = io.BytesIO()
+        resized.save(buffer, "PNG")
+        png_data[size] = buffer.getvalue()
+
+    return png_data
+
+
+def icns_sizes() -> List[int]:
+    """ Get unique pixel sizes stored in icns """
+    return sorted(set(size for _, size in ICNS_CHUNKS))
+
+
+def encode_icns(
+    image: PILImage, sized_images: Optional[Dict[int, PILImage]] = None
+) -> bytes:
+    """
+    Encode square master image (512px or larger) as icns bytes
+    sized_images - optional native renders (size -> image) used over resizing
+    """
+    png_data = encode_png_sizes(image, icns_sizes(), sized_images)
+    chunks = [(ostype, png_data[size]) for ostype, size in ICNS_CHUNKS]
+
+    # table of contents
+    toc = b"".join(
+        struct.pack(">4sI", ostype, HEADER_SIZE + len(data)) for ostype, data in chunks
+    )
+    body = [struct.pack(">4sI", b"TOC ", HEADER_SIZE + len(toc)), toc]
+
+    # image chunks
+    for ostype, data in chunks:
+        body.append(struct.pack(">4sI", ostype, HEADER_SIZE + len(data)))
+        body.append(data)
+
+    total_size = HEADER_SIZE + sum(map(len, body))
+    return b"".join([struct.pack(">4sI", b"icns", total_size)] + body)
+
+
+def write_icns(
+    image: PILImage, icn_path: str, sized_images: Optional[Dict[int, PILImage]] = None
+):
+    """ Write image as icns file """
+    with open(icn_path, "wb") as icn_file:
+        icn_file.write(encode_icns(image, sized_images))
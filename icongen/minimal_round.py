@@ -1,32 +1,161 @@
 # Minimal Round Icon Generator
 # ----------------------------
 
-from typing import Optional, Tuple
+from typing import BinaryIO, Callable, Dict, Iterable, List, NamedTuple, Optional
+from typing import Tuple, Union
 
+import os
 import random
 import math
-
+import shutil
+import hashlib
+import functools
+import threading
+import contextlib
+from collections import OrderedDict
+
+import numpy as np  # type: ignore
 from PIL import Image  # type: ignore
 from PIL.Image import Image as PILImage  # type: ignore
 
 from svg2png import parser
+from svg2png import instrument
+from svg2png.vector import DrawableObjectStore, POLYGON, COVERAGE
 
+from . import png
 from .palette import PALETTES
-from .utils import Color, LinearGradient, BBox
+from .utils import Box, Color, LinearGradient, BBox
 
 # type hints
 IntPair = Tuple[int, int]
 RGBATuple = Tuple[int, int, int, int]
-
-
-CURRENT_PALETTE: dict = {}
+RuleMatch = Callable[[np.ndarray], np.ndarray]
+RuleReplace = Union[RGBATuple, Callable[[np.ndarray], np.ndarray]]
+RemapRule = Tuple[RuleMatch, RuleReplace]
+
+
+# Design Parameters
+# ---------------------
+DESIGN_PARAMS = {
+    "svg_fraction": 0.5,
+    "circle_fraction": 0.77,
+    "outline_fraction": 0.83,
+}
+# ---------------------
+
+# supersampling factor for each output size
+# small sizes get more samples to keep edges crisp
+# (coverage backend is anti-aliased as drawn, it renders at output size)
+DEFAULT_SUPERSAMPLE = 2
+SUPERSAMPLE = {16: 4, 32: 4}
+
+# tiled rendering - bytes held per canvas pixel of a band
+# (background, gradient positions, svg layer, remap in / out, resize)
+TILE_BYTES_PER_PIXEL = 64
+DEFAULT_MEMORY_BUDGET = 64 * 2 ** 20
+
+
+class RenderContext(NamedTuple):
+    """
+    Render Context
+    --------------
+    Everything a single render depends on, passed explicitly so
+    renders never share mutable state (safe across threads)
+    - palette          - palette dict (see palette.PALETTES)
+    - size             - output size in px
+    - supersample      - render at size * supersample, then downscale
+    - backend          - svg rasterizer (see svg2png.vector.BACKENDS)
+    - flatness         - max distance of flattened curves from true curves
+                         in canvas px (None = svg2png DEFAULT_FLATNESS),
+                         larger is faster and coarser
+    - remap_rules      - extra (match, replace) svg color rules, run after
+                         the inbuilt ones (see ColorMap.add_rule)
+    - svg_fraction     - svg size relative to canvas
+    - circle_fraction  - background circle size relative to canvas
+    - outline_fraction - outline ring size relative to canvas
+    """
+
+    palette: dict
+    size: IntPair
+    supersample: int
+    backend: str
+    flatness: Optional[float]
+    remap_rules: Tuple[RemapRule, ...]
+    svg_fraction: float
+    circle_fraction: float
+    outline_fraction: float
+
+    @classmethod
+    def create(
+        cls,
+        color_scheme: Optional[str] = None,
+        size: IntPair = (512, 512),
+        supersample: Optional[int] = None,
+        backend: str = POLYGON,
+        remap_rules: Iterable[RemapRule] = (),
+        flatness: Optional[float] = None,
+    ) -> "RenderContext":
+        """
+        Build context from palette name (random if None) and DESIGN_PARAMS
+        supersample defaults to 1 for the coverage backend
+        """
+        color_scheme = color_scheme or random.choice(list(PALETTES.keys()))
+        default_supersample = 1 if backend == COVERAGE else DEFAULT_SUPERSAMPLE
+        return cls(
+            palette=PALETTES[color_scheme],
+            size=tuple(size),  # type: ignore
+            supersample=supersample or default_supersample,
+            backend=backend,
+            flatness=flatness,
+            remap_rules=tuple(remap_rules),
+            **DESIGN_PARAMS,
+        )
+
+    @property
+    def canvas_size(self) -> IntPair:
+        """ Size of supersampled drawing surface """
+        w, h = self.size
+        return (w * self.supersample, h * self.supersample)
+
+    def resized(
+        self, size: IntPair, supersample: int, flatness: Optional[float] = None
+    ) -> "RenderContext":
+        """
+        Same palette and design at other output size
+        flatness (if given) replaces the curve tolerance for that size
+        """
+        flatness = self.flatness if flatness is None else flatness
+        return self._replace(size=size, supersample=supersample, flatness=flatness)
 
 
 class ColorMap:
-    def __init__(self):
-        self.palette = CURRENT_PALETTE
+    def __init__(self, palette: dict, rules: Iterable[RemapRule] = ()):
+        self.palette = palette
         self.extra1 = Color(self.palette["extra1"]).rgba
 
+        # extra rules, checked after the inbuilt ones
+        self._rules: List[RemapRule] = []
+        for match, replace in rules:
+            self.add_rule(match, replace)
+
+    @classmethod
+    def from_context(cls, context: "RenderContext") -> "ColorMap":
+        """ Color map of context palette and remap rules """
+        return cls(context.palette, context.remap_rules)
+
+    def add_rule(self, match: RuleMatch, replace: RuleReplace):
+        """
+        Register extra remap rule
+        -------------------------
+        - match   - takes (..., 4) rgba array, returns boolean mask (...)
+        - replace - rgba tuple, or function taking the matched (n, 4)
+                    pixels and returning their new (n, 4) values
+        First matching rule wins, so rules run in registration order.
+        Renders take rules through RenderContext.remap_rules (palette
+        independent, so variants of one svg share them).
+        """
+        self._rules.append((match, replace))
+
     def remap(self, in_color: RGBATuple) -> RGBATuple:
         """ Remap colours """
 
@@ -43,79 +172,620 @@ class ColorMap:
         if in_color[0] == 255 and in_color[1] == in_color[2] == 0:
             return self.extra1
 
+        # registered rules (evaluated as single pixel array)
+        if self._rules:
+            pixel = np.array([in_color], dtype=np.uint8)
+            r, g, b, a = map(int, self._apply_rules(pixel)[0])
+            return (r, g, b, a)
+
         # no conditions met -> return original color
         return in_color
 
+    def remap_array(self, pixels: np.ndarray) -> np.ndarray:
+        """
+        Remap colours of whole (..., 4) uint8 rgba array at once.
+        Same rules as remap, returns new array.
+        """
+        r, g, b, a = (pixels[..., i] for i in range(4))
+        out = pixels.copy()
 
-def draw_circle(image: Image, radius: float, outline: float):
-    w, h = image.width, image.height
-
-    _, col1, col2 = CURRENT_PALETTE["primary"].split(" ")
-    lin_grad = LinearGradient(col1, col2, 90)
-    lin_grad.bake(w, h, scale=1, resolution=100)
-
-    def get_circle_pixel(i):
-        y, x = i // w, i % w
-        dist_2 = (x - w / 2) ** 2 + (y - h / 2) ** 2
+        # early stop for transparent
+        pending = a != 0
 
-        # interior
-        rad_2 = (radius * w / 2) ** 2
-        if dist_2 <= rad_2:
-            return lin_grad.calculate2D(x, y)
+        # rule1: black <-> white => transparent <-> white
+        gray = pending & (r == g) & (g == b)
+        out[gray] = r[gray, None]
+        pending &= ~gray
 
-        # outline
-        out_2 = (outline * w / 2) ** 2
-        if dist_2 <= out_2:
-            return (255,) * 4
+        # rule2: pure r/g/b -> extra colors
+        red = self.extra_mask(pixels)
+        out[red] = self.extra1
+        pending &= ~red
 
-        # exterior
-        return (0, 0, 0, 0)
+        # registered rules on the rest
+        if self._rules and pending.any():
+            out[pending] = self._apply_rules(pixels[pending])
 
-    circle_pixels = list(map(get_circle_pixel, range(w * h)))
-    image.putdata(circle_pixels)
+        return out
 
+    @staticmethod
+    def extra_mask(pixels: np.ndarray) -> np.ndarray:
+        """ Get mask of pixels recolored to extra1 (only palette dependent rule) """
+        r, g, b, a = (pixels[..., i] for i in range(4))
+        return (a != 0) & (r == 255) & (g == 0) & (b == 0)
 
-def render_svg(
-    path: str, render_size: IntPair, color_scheme: Optional[str] = None
-) -> PILImage:
-    """ Create a custom styled png from svg file """
+    def _apply_rules(self, pixels: np.ndarray) -> np.ndarray:
+        """ Apply registered rules to (n, 4) pixel array """
+        out = pixels.copy()
+        pending = np.ones(len(pixels), dtype=bool)
 
-    global CURRENT_PALETTE
+        for match, replace in self._rules:
+            mask = pending & match(pixels)
+            if callable(replace):
+                out[mask] = replace(pixels[mask])
+            else:
+                out[mask] = replace
+            pending &= ~mask
 
-    # Design Parameters
-    # ---------------------
-    svg_fraction = 0.5
-    circle_fraction = 0.77
-    outline_fraction = 0.83
-    # ---------------------
+        return out
 
-    # set color scheme
-    color_scheme = color_scheme or random.choice(list(PALETTES.keys()))
-    CURRENT_PALETTE = PALETTES[color_scheme]
 
-    # render at twice the final size
-    initial_size = tuple(map(lambda x: x * 2, render_size))
+def draw_circle(image: Image, context: RenderContext):
+    """ Draw background circle with context palette and fractions """
+    w, h = image.width, image.height
+    radius, outline = context.circle_fraction, context.outline_fraction
+
+    _, col1, col2 = context.palette["primary"].split(" ")
+    lin_grad = LinearGradient.two_color(col1, col2, 90)
+
+    # coverage backend is not downsampled, so edges are anti-aliased here
+    if context.backend == COVERAGE:
+        circle_pixels = circle_coverage_pixels(w, h, radius, outline, lin_grad)
+
+    else:
+        # region masks (shared between renders of same size)
+        interior, outline_ring = circle_masks(w, h, radius, outline)
+
+        # exterior stays transparent
+        circle_pixels = np.zeros((h, w, 4), dtype=np.uint8)
+        circle_pixels[outline_ring] = 255
+        circle_pixels[interior] = lin_grad.calculate_field(w, h)[interior]
+
+    image.frombytes(circle_pixels.tobytes())
+
+
+def circle_coverage_pixels(
+    w: int, h: int, radius: float, outline: float, gradient: LinearGradient
+) -> np.ndarray:
+    """
+    Get anti-aliased background circle pixels (gradient interior, white ring)
+    Coverage of each edge approximated from pixel center distance
+    """
+    y, x = np.ogrid[0:h, 0:w]
+    dist = np.hypot(x + 0.5 - w / 2, y + 0.5 - h / 2)
+    interior = np.clip(radius * w / 2 - dist + 0.5, 0, 1)[..., None]
+    disk = np.clip(outline * w / 2 - dist + 0.5, 0, 1)[..., None]
+
+    # white ring under interior, straight alpha from disk coverage
+    field = gradient.calculate_field(w, h)[..., :3]
+    premul = 255 * (disk - interior) + field * interior
+    color = np.divide(premul, disk, out=np.zeros_like(premul), where=disk > 0)
+
+    circle_pixels = np.empty((h, w, 4), dtype=np.uint8)
+    circle_pixels[..., :3] = np.rint(np.clip(color, 0, 255))
+    circle_pixels[..., 3] = np.rint(255 * disk[..., 0])
+    return circle_pixels
+
+
+def circle_region(context: RenderContext, box: Box) -> np.ndarray:
+    """
+    Get background circle pixels for box (left, top, right, bottom) of canvas
+    Same pixels as draw_circle, nothing canvas sized is built or memoized
+    """
+    w, h = context.canvas_size
+    radius, outline = context.circle_fraction, context.outline_fraction
+
+    _, col1, col2 = context.palette["primary"].split(" ")
+    lin_grad = LinearGradient.two_color(col1, col2, 90)
+    interior, outline_ring = circle_masks(w, h, radius, outline, box)
+
+    region_pixels = np.zeros(interior.shape + (4,), dtype=np.uint8)
+    region_pixels[outline_ring] = 255
+    region_pixels[interior] = lin_grad.calculate_region(w, h, box)[interior]
+    return region_pixels
+
+
+def circle_masks(
+    w: int, h: int, radius: float, outline: float, box: Optional[Box] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Get (interior, outline ring) boolean masks of background circle
+    Whole canvas masks are memoized and read only, reused by every
+    render of the same size, box (left, top, right, bottom) masks are not
+    """
+    if box is None:
+        return _canvas_circle_masks(w, h, radius, outline)
+    return _circle_masks(w, h, radius, outline, box)
+
+
+@functools.lru_cache(maxsize=16)
+def _canvas_circle_masks(
+    w: int, h: int, radius: float, outline: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    interior, outline_ring = _circle_masks(w, h, radius, outline, (0, 0, w, h))
+    interior.setflags(write=False)
+    outline_ring.setflags(write=False)
+    return interior, outline_ring
+
+
+def _circle_masks(
+    w: int, h: int, radius: float, outline: float, box: Box
+) -> Tuple[np.ndarray, np.ndarray]:
+
+    # squared distance field from center
+    left, top, right, bottom = box
+    y, x = np.ogrid[top:bottom, left:right]
+    dist_2 = (x - w / 2) ** 2 + (y - h / 2) ** 2
+
+    # region masks
+    rad_2 = (radius * w / 2) ** 2
+    out_2 = (outline * w / 2) ** 2
+    interior = dist_2 <= rad_2
+    outline_ring = (dist_2 <= out_2) & ~interior
+    return interior, outline_ring
+
+
+class BackgroundStore:
+    """
+    Background Layer Store
+    ----------------------
+    - memoized background circle layers (only depend on palette + size)
+    - keyed by palette primary, circle / outline fractions and canvas size
+    - least recently used layers dropped beyond max_layers
+    - optional on-disk copy in cache_dir (shared across processes / runs)
+    """
+
+    # bump when draw_circle output changes (invalidates on-disk layers)
+    LAYER_VERSION = 2
+
+    def __init__(self, max_layers: int = 32, cache_dir: Optional[str] = None):
+        self.max_layers = max_layers
+        self.cache_dir = cache_dir
+        self._layers: "OrderedDict[tuple, PILImage]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, context: RenderContext, scaled: bool = False) -> PILImage:
+        """
+        Get background layer for context palette at its canvas size
+        scaled gets it downsampled to output size instead
+        Returned image is shared, copy before drawing on it
+        """
+        size = context.size if scaled else context.canvas_size
+        radius, outline = context.circle_fraction, context.outline_fraction
+        primary = context.palette["primary"]
+        key = (
+            self.LAYER_VERSION,
+            primary,
+            radius,
+            outline,
+            context.backend,
+            context.canvas_size,
+            size,
+        )
+
+        # memory
+        with self._lock:
+            if key in self._layers:
+                self._layers.move_to_end(key)
+                return self._layers[key]
+
+        # disk, else draw (and save)
+        # (threads racing on a new key draw identical layers)
+        layer = self._load(key)
+        if layer is None and scaled:
+            layer = self.get(context).resize(size, resample=Image.BICUBIC)
+            self._save(key, layer)
+        elif layer is None:
+            layer = Image.new("RGBA", size)
+            draw_circle(layer, context)
+            self._save(key, layer)
+
+        with self._lock:
+            self._layers[key] = layer
+            while len(self._layers) > self.max_layers:
+                self._layers.popitem(last=False)
+
+        return layer
+
+    def invalidate(self):
+        """ Drop all layers (call after PALETTES or design params change) """
+        with self._lock:
+            self._layers.clear()
+        if self.cache_dir:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def _disk_path(self, key: tuple) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        digest = hashlib.sha256(repr(key).encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.npy")
+
+    def _load(self, key: tuple) -> Optional[PILImage]:
+        path = self._disk_path(key)
+        if not path or not os.path.isfile(path):
+            return None
+        with contextlib.suppress(OSError, ValueError):
+            pixels = np.load(path)
+            return Image.frombytes("RGBA", key[-1], pixels.tobytes())
+        return None
+
+    def _save(self, key: tuple, layer: PILImage):
+        path = self._disk_path(key)
+        if not path:
+            return
+        with contextlib.suppress(OSError):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.npy"
+            np.save(temp_path, np.asarray(layer))
+            os.replace(temp_path, path)
+
+
+BACKGROUNDS = BackgroundStore()
+
+
+def set_background_cache_dir(cache_dir: Optional[str]):
+    """ Enable on-disk copy of background layers (usable as pool initializer) """
+    BACKGROUNDS.cache_dir = cache_dir
 
-    # create surface with background circle
-    surface_bb = BBox(initial_size)
-    surface_im = Image.new("RGBA", initial_size)
-    draw_circle(surface_im, circle_fraction, outline_fraction)
 
-    # draw svg on separate image for remapping
-    svg_im = Image.new("RGBA", initial_size)
-    svg_bb = surface_bb.get_sub_bbox(svg_fraction)
+def render_svg(
+    path: str,
+    render_size: IntPair,
+    color_scheme: Optional[str] = None,
+    backend: str = POLYGON,
+    remap_rules: Iterable[RemapRule] = (),
+    flatness: Optional[float] = None,
+) -> PILImage:
+    """
+    Create a custom styled png from svg file
+    remap_rules - extra svg color rules (see ColorMap.add_rule)
+    flatness    - curve tolerance in canvas px (see RenderContext)
+    """
+    context = RenderContext.create(
+        color_scheme,
+        render_size,
+        backend=backend,
+        remap_rules=remap_rules,
+        flatness=flatness,
+    )
+    draw_store = parser.parse_svg_file(path)
+    return render_store(draw_store, context)
+
+
+def render_svg_sizes(
+    path: str,
+    sizes: Iterable[int],
+    color_scheme: Optional[str] = None,
+    supersample: Optional[Dict[int, int]] = None,
+    backend: str = POLYGON,
+    remap_rules: Iterable[RemapRule] = (),
+    flatness: Optional[Dict[int, float]] = None,
+) -> Dict[int, PILImage]:
+    """
+    Render square icon natively at each size (no downscaled master)
+    svg is parsed once, supersample maps size -> factor (see SUPERSAMPLE)
+    coverage backend renders at output size unless supersample says otherwise
+    flatness maps size -> curve tolerance, trading quality against speed
+    per size (sizes not in it use the default)
+    """
+    context = RenderContext.create(
+        color_scheme, backend=backend, remap_rules=remap_rules
+    )
+    factors = dict(supersample or {})
+    tolerances = dict(flatness or {})
+    if backend != COVERAGE:
+        factors = {**SUPERSAMPLE, **factors}
+    draw_store = parser.parse_svg_file(path)
+    return {
+        size: render_store(
+            draw_store,
+            context.resized(
+                (size, size),
+                factors.get(size, context.supersample),
+                tolerances.get(size),
+            ),
+        )
+        for size in sizes
+    }
+
+
+def render_svg_variants(
+    path: str,
+    render_size: IntPair,
+    palettes: Optional[Iterable[str]] = None,
+    backend: str = POLYGON,
+    remap_rules: Iterable[RemapRule] = (),
+    flatness: Optional[float] = None,
+) -> Dict[str, PILImage]:
+    """
+    Render svg in each palette (all PALETTES if not given)
+    svg is parsed, rasterized and remapped once for every palette
+    """
+    draw_store = parser.parse_svg_file(path)
+    names = list(palettes or PALETTES)
+    remap_rules = tuple(remap_rules)
+    contexts = [
+        RenderContext.create(
+            name,
+            render_size,
+            backend=backend,
+            remap_rules=remap_rules,
+            flatness=flatness,
+        )
+        for name in names
+    ]
+    return dict(zip(names, render_store_variants(draw_store, contexts)))
+
+
+def render_svg_tiled(
+    path: str,
+    render_size: IntPair,
+    out_file: Union[str, BinaryIO],
+    color_scheme: Optional[str] = None,
+    memory_budget: int = DEFAULT_MEMORY_BUDGET,
+    remap_rules: Iterable[RemapRule] = (),
+    flatness: Optional[float] = None,
+) -> int:
+    """
+    Render svg as png to out_file (path or binary file) in horizontal bands
+    Background, svg layer and composite only exist one band at a time and
+    rows are encoded as they are downsampled, so image buffers stay near
+    memory_budget at any size (same pixels as render_svg)
+    Returns number of bands rendered
+    """
+    context = RenderContext.create(
+        color_scheme, render_size, remap_rules=remap_rules, flatness=flatness
+    )
     draw_store = parser.parse_svg_file(path)
-    draw_store.draw_all(svg_im, tuple(svg_bb))
-
-    # remap svg colors
-    pixdata = svg_im.load()
-    cmap = ColorMap()
-    for j in range(svg_im.height):
-        for i in range(svg_im.width):
-            pixdata[i, j] = cmap.remap(pixdata[i, j])
 
-    # paste svg on background image
-    surface_im.alpha_composite(svg_im)
+    scale = context.supersample
+    canvas_w, canvas_h = context.canvas_size
+    out_w, out_h = context.size
+
+    # canvas rows above / below a band read by the bicubic filter
+    margin = 3 * scale
+    budget_rows = memory_budget // (canvas_w * TILE_BYTES_PER_PIXEL)
+    band_h = max((budget_rows - 2 * margin) // scale, 1)
+
+    left, top, width, height = BBox(context.canvas_size).get_sub_bbox(
+        context.svg_fraction
+    )
+    cmap = ColorMap.from_context(context)
+
+    with contextlib.ExitStack() as stack:
+        if isinstance(out_file, str):
+            out_file = stack.enter_context(open(out_file, "wb"))
+        writer = stack.enter_context(png.PNGWriter(out_file, context.size))
+
+        for out_top in range(0, out_h, band_h):
+            out_bottom = min(out_top + band_h, out_h)
+            band_top = max(out_top * scale - margin, 0)
+            band_bottom = min(out_bottom * scale + margin, canvas_h)
+            band_size = (canvas_w, band_bottom - band_top)
+
+            with instrument.stage("background"):
+                band_box = (0, band_top, canvas_w, band_bottom)
+                bg_pixels = circle_region(context, band_box)
+                surface_im = Image.frombytes("RGBA", band_size, bg_pixels.tobytes())
+                del bg_pixels
+
+            # svg drawn with band top at row 0
+            with instrument.stage("draw"):
+                svg_im = Image.new("RGBA", band_size)
+                svg_bb = (left, top, width, height)
+                draw_store.draw_all(
+                    svg_im, svg_bb, context.flatness, origin=(0, band_top)
+                )
+
+            with instrument.stage("remap"):
+                svg_pixels = cmap.remap_array(np.asarray(svg_im))
+                svg_im.frombytes(svg_pixels.tobytes())
+                instrument.peak_buffers(
+                    "peak_image_bytes", surface_im, svg_im, svg_pixels
+                )
+                del svg_pixels
+
+            with instrument.stage("composite"):
+                surface_im.alpha_composite(svg_im)
+                del svg_im
+
+            with instrument.stage("resize"):
+                resize_box = (
+                    0,
+                    out_top * scale - band_top,
+                    canvas_w,
+                    out_bottom * scale - band_top,
+                )
+                rows = surface_im.resize(
+                    (out_w, out_bottom - out_top), Image.BICUBIC, box=resize_box
+                )
+                instrument.peak_buffers("peak_image_bytes", surface_im, rows)
+                del surface_im
+
+            with instrument.stage("encode"):
+                writer.write_rows(np.asarray(rows))
+
+    return -(-out_h // band_h)
+
+
+def render_store(draw_store: DrawableObjectStore, context: RenderContext) -> PILImage:
+    """ Create a custom styled image from parsed svg """
+    return render_store_variants(draw_store, [context])[0]
+
+
+def render_store_variants(
+    draw_store: DrawableObjectStore, contexts: List[RenderContext]
+) -> List[PILImage]:
+    """
+    Create custom styled image from parsed svg for each context
+    Contexts may only differ by palette, palettes only change the
+    background layer and extra1 pixels, so svg layer is shared
+    (coverage backend recolors fills while drawing, so its svg layer is
+    redrawn for each distinct extra1 color instead)
+    """
+    first = contexts[0]
+    if any(ctx._replace(palette=first.palette) != first for ctx in contexts):
+        raise ValueError("variant contexts may only differ by palette")
+
+    # render at multiple of the final size
+    initial_size = first.canvas_size
+
+    # coverage backend - svg layers drawn remapped, one per extra1 color
+    if first.backend == COVERAGE:
+        svg_layers: Dict[str, np.ndarray] = {}
+        for context in contexts:
+            extra1 = context.palette["extra1"]
+            if extra1 not in svg_layers:
+                with instrument.holding(*svg_layers.values()):
+                    svg_layers[extra1] = draw_coverage_layer(draw_store, context)
+        svg_pixels = svg_layers[first.palette["extra1"]]
+        svg_box = Image.fromarray(svg_pixels).getbbox()
+        extra_mask = None
+        layers: tuple = tuple(svg_layers.values())
 
-    # downsample with BICUBIC filter
-    return surface_im.resize(render_size, resample=Image.BICUBIC)
+    # draw svg on separate image for remapping
+    else:
+        with instrument.stage("draw"):
+            svg_im = Image.new("RGBA", initial_size)
+            svg_bb = BBox(initial_size).get_sub_bbox(first.svg_fraction)
+            draw_store.draw_all(svg_im, tuple(svg_bb), first.flatness)
+        instrument.count("vertices", draw_store.vertex_count)
+
+        # remap svg colors (palette dependent pixels redone per variant)
+        with instrument.stage("remap"):
+            in_pixels = np.asarray(svg_im)
+            svg_pixels = ColorMap.from_context(first).remap_array(in_pixels)
+            extra_mask = ColorMap.extra_mask(in_pixels) if len(contexts) > 1 else None
+        svg_box = svg_im.getbbox()
+        layers = (in_pixels, svg_pixels, extra_mask)
+        instrument.peak_buffers("peak_image_bytes", svg_im, *layers)
+
+        if instrument.active():
+            remapped = np.any(svg_pixels != in_pixels, axis=-1)
+            instrument.count("remapped_pixels", int(np.count_nonzero(remapped)))
+        del svg_im
+
+    # only output pixels near the svg differ from the scaled background
+    region = svg_region(svg_box, first)
+    if region is None:
+        return [BACKGROUNDS.get(ctx, scaled=True).copy() for ctx in contexts]
+    out_box, crop_box, resize_box = region
+    crop_l, crop_t, crop_r, crop_b = crop_box
+    out_size = (out_box[2] - out_box[0], out_box[3] - out_box[1])
+
+    images = []
+    for context in contexts:
+        # create surface from cached background circle
+        with instrument.stage("background"):
+            image = BACKGROUNDS.get(context, scaled=True).copy()
+            surface_im = BACKGROUNDS.get(context).crop(crop_box)
+
+        with instrument.stage("remap"):
+            if extra_mask is not None:
+                svg_pixels[extra_mask] = Color(context.palette["extra1"]).rgba
+            elif first.backend == COVERAGE:
+                svg_pixels = svg_layers[context.palette["extra1"]]
+            svg_crop = np.ascontiguousarray(svg_pixels[crop_t:crop_b, crop_l:crop_r])
+            svg_im = Image.frombytes("RGBA", surface_im.size, svg_crop.tobytes())
+
+        # paste svg on background image
+        with instrument.stage("composite"):
+            surface_im.alpha_composite(svg_im)
+
+        # downsample with BICUBIC filter (nothing to do at output size)
+        with instrument.stage("resize"):
+            if first.supersample == 1:
+                patch = surface_im.crop(resize_box)
+            else:
+                patch = surface_im.resize(out_size, Image.BICUBIC, box=resize_box)
+            image.paste(patch, out_box[:2])
+            images.append(image)
+
+        # memoized background layers are not counted, they outlive renders
+        instrument.peak_buffers(
+            "peak_image_bytes", surface_im, svg_crop, svg_im, patch, *images, *layers
+        )
+
+    return images
+
+
+def draw_coverage_layer(
+    draw_store: DrawableObjectStore, context: RenderContext
+) -> np.ndarray:
+    """
+    Draw svg with coverage backend, fills remapped before they are drawn
+    (remapping pixels afterwards would break anti-aliased edges)
+    Returns canvas sized rgba pixels
+    """
+    canvas_size = context.canvas_size
+    with instrument.stage("draw"):
+        svg_im = Image.new("RGBA", canvas_size)
+        svg_bb = BBox(canvas_size).get_sub_bbox(context.svg_fraction)
+        recolor = ColorMap.from_context(context).remap
+        draw_store.draw_all(
+            svg_im,
+            tuple(svg_bb),
+            context.flatness,
+            backend=COVERAGE,
+            recolor=recolor,
+        )
+    instrument.count("vertices", draw_store.vertex_count)
+    svg_pixels = np.array(svg_im)
+    instrument.peak_buffers("peak_image_bytes", svg_im, svg_pixels)
+    return svg_pixels
+
+
+def svg_region(
+    svg_box: Optional[Tuple[int, int, int, int]], context: RenderContext
+) -> Optional[Tuple[tuple, tuple, tuple]]:
+    """
+    Get boxes to composite and downsample only around svg pixels
+    ------------------------------------------------------------
+    - out_box    - output pixels whose filter window touches svg_box
+    - crop_box   - canvas pixels those outputs read (filter margin included)
+    - resize_box - out_box in canvas pixels, relative to crop_box
+    None if svg layer is empty (output is the scaled background)
+    """
+    if svg_box is None:
+        return None
+
+    # bicubic filter support in canvas pixels (2 output pixels)
+    scale = context.supersample
+    support = 2 * scale
+    out_w, out_h = context.size
+    canvas_w, canvas_h = context.canvas_size
+
+    left, top, right, bottom = svg_box
+    out_box = (
+        max((left - support) // scale - 1, 0),
+        max((top - support) // scale - 1, 0),
+        min(-(-(right + support) // scale) + 1, out_w),
+        min(-(-(bottom + support) // scale) + 1, out_h),
+    )
+
+    in_box = tuple(x * scale for x in out_box)
+    margin = support + scale
+    crop_box = (
+        max(in_box[0] - margin, 0),
+        max(in_box[1] - margin, 0),
+        min(in_box[2] + margin, canvas_w),
+        min(in_box[3] + margin, canvas_h),
+    )
+
+    resize_box = (
+        in_box[0] - crop_box[0],
+        in_box[1] - crop_box[1],
+        in_box[2] - crop_box[0],
+        in_box[3] - crop_box[1],
+    )
+    return out_box, crop_box, resize_box
@@ -0,0 +1,149 @@
+# PNG Writer
+# ----------
+# Streams rgba rows into a png file, the image is never held whole
+# Rows are filtered (adaptive, per row like libpng) and deflated as they arrive
+
+# png
+# ├─ signature
+# ├─ IHDR - size, 8 bit rgba
+# ├─ IDAT - deflated filtered rows (split over chunks)
+# └─ IEND
+
+from typing import BinaryIO, Tuple
+
+import zlib
+import struct
+
+import numpy as np  # type: ignore
+
+
+SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# rgba, 8 bit per channel
+BYTES_PER_PIXEL = 4
+
+# compressed bytes buffered before an IDAT chunk is written
+CHUNK_SIZE = 2 ** 20
+
+# rows filtered together (bounds filter scratch memory)
+FILTER_ROWS = 64
+
+
+def paeth(left: np.ndarray, up: np.ndarray, up_left: np.ndarray) -> np.ndarray:
+    """ Paeth predictor for int16 arrays """
+    base = left + up - up_left
+    dist_l = np.abs(base - left)
+    dist_u = np.abs(base - up)
+    dist_ul = np.abs(base - up_left)
+    return np.where(
+        (dist_l <= dist_u) & (dist_l <= dist_ul),
+        left,
+        np.where(dist_u <= dist_ul, up, up_left),
+    )
+
+
+def filter_rows(rows: np.ndarray, prev_row: np.ndarray) -> np.ndarray:
+    """
+    Filter (n, stride) uint8 rows, prev_row is the row above the first one
+    Picks the filter with least sum of absolute (signed) bytes per row
+    Returns (n, 1 + stride) uint8, filter type byte first
+    """
+    cur = rows.astype(np.int16)
+    up = np.vstack([prev_row[None], rows[:-1]]).astype(np.int16)
+
+    # neighbour one pixel to the left (zero on first pixel)
+    left = np.zeros_like(cur)
+    left[:, BYTES_PER_PIXEL:] = cur[:, :-BYTES_PER_PIXEL]
+    up_left = np.zeros_like(up)
+    up_left[:, BYTES_PER_PIXEL:] = up[:, :-BYTES_PER_PIXEL]
+
+    # none, sub, up, average, paeth
+    candidates = np.stack(
+        [
+            cur,
+            cur - left,
+            cur - up,
+            cur - ((left + up) >> 1),
+            cur - paeth(left, up, up_left),
+        ]
+    ).astype(np.uint8)
+
+    cost = np.abs(candidates.view(np.int8).astype(np.int32)).sum(axis=2)
+    choice = np.argmin(cost, axis=0)
+
+    out = np.empty((len(rows), rows.shape[1] + 1), dtype=np.uint8)
+    out[:, 0] = choice
+    out[:, 1:] = candidates[choice, np.arange(len(rows))]
+    return out
+
+
+def write_chunk(out_file: BinaryIO, ctype: bytes, data: bytes):
+    """ Write png chunk (length, type, data, crc) """
+    out_file.write(struct.pack(">I", len(data)))
+    out_file.write(ctype)
+    out_file.write(data)
+    out_file.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(ctype))))
+
+
+class PNGWriter:
+    """
+    PNG Writer
+    ----------
+    - rows are added top to bottom with write_rows, as (n, w, 4) uint8
+    - memory use is bounded by the rows passed in, not the image size
+    - close (or leaving with block) writes the end of the file
+    """
+
+    def __init__(self, out_file: BinaryIO, size: Tuple[int, int], compress_level=6):
+        self.out_file = out_file
+        self.width, self.height = size
+        self.rows_written = 0
+
+        stride = self.width * BYTES_PER_PIXEL
+        self._prev_row = np.zeros(stride, dtype=np.uint8)
+        self._compressor = zlib.compressobj(compress_level)
+        self._pending = bytearray()
+
+        out_file.write(SIGNATURE)
+        header = struct.pack(">IIBBBBB", self.width, self.height, 8, 6, 0, 0, 0)
+        write_chunk(out_file, b"IHDR", header)
+
+    def __enter__(self) -> "PNGWriter":
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        # incomplete file is left as is on errors
+        if exc_type is None:
+            self.close()
+
+    def write_rows(self, rows: np.ndarray):
+        """ Add (n, w, 4) uint8 rgba rows below previously written ones """
+        if rows.shape[1:] != (self.width, BYTES_PER_PIXEL):
+            raise ValueError(f"expected rows of {self.width} rgba pixels")
+        if self.rows_written + len(rows) > self.height:
+            raise ValueError("more rows than image height")
+
+        flat = rows.reshape(len(rows), -1)
+        for start in range(0, len(flat), FILTER_ROWS):
+            block = flat[start : start + FILTER_ROWS]
+            filtered = filter_rows(block, self._prev_row)
+            self._prev_row = block[-1].copy()
+            self._pending += self._compressor.compress(filtered.tobytes())
+            if len(self._pending) >= CHUNK_SIZE:
+                self._flush()
+
+        self.rows_written += len(rows)
+
+    def close(self):
+        """ Finish compressed stream and write end of file """
+        if self.rows_written != self.height:
+            raise ValueError(f"{self.rows_written} of {self.height} rows written")
+
+        self._pending += self._compressor.flush()
+        self._flush()
+        write_chunk(self.out_file, b"IEND", b"")
+
+    def _flush(self):
+        if self._pending:
+            write_chunk(self.out_file, b"IDAT", bytes(self._pending))
+            self._pending.clear()
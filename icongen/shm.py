@@ -0,0 +1,195 @@
+# Shared Memory Renderer
+# ----------------------
+# Process pool rendering raw rgba images without pickling pixels
+# Workers write into pooled shared memory blocks, the parent wraps them
+# zero copy, only block names and sizes go through the pipes
+
+# render_images
+# ├─ parent - leases a free block big enough for spec, submits spec + name
+# ├─ worker - renders, copies pixels into the block
+# └─ parent - Image.frombuffer over block, block freed on next request
+
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import os
+import itertools
+import threading
+from multiprocessing import shared_memory
+from concurrent.futures import Future, FIRST_COMPLETED
+from concurrent.futures import ProcessPoolExecutor, wait
+
+import numpy as np  # type: ignore
+from PIL import Image  # type: ignore
+from PIL.Image import Image as PILImage  # type: ignore
+
+from . import minimal_round
+from .stream import RenderSpec
+
+BYTES_PER_PIXEL = 4
+
+# blocks dropped while an image still wrapped them (already unlinked)
+# kept alive until that image is released, then closed
+# shared by all pools, guarded by _PENDING_LOCK
+_PENDING_CLOSE: List[shared_memory.SharedMemory] = []
+_PENDING_LOCK = threading.Lock()
+
+
+def close_released_blocks():
+    """ Close pending blocks that no image wraps anymore """
+    with _PENDING_LOCK:
+        for block in list(_PENDING_CLOSE):
+            try:
+                block.close()
+            except BufferError:
+                continue
+            _PENDING_CLOSE.remove(block)
+
+
+def render_into(spec: RenderSpec, block_name: str) -> Tuple[int, int]:
+    """
+    Render spec and copy its rgba pixels to start of shared block
+    (runs inside worker), returns image size
+    """
+    if spec.format != "png":
+        raise ValueError(f"unsupported image format - {spec.format}")
+
+    image = minimal_round.render_svg(spec.svg_path, (spec.size, spec.size), spec.color)
+    pixels = np.asarray(image.convert("RGBA"))
+
+    # attached per render (cheap next to it), so workers never keep
+    # blocks the parent has dropped alive
+    block = shared_memory.SharedMemory(block_name)
+    try:
+        target = np.frombuffer(block.buf, np.uint8, pixels.size)  # type: ignore
+        target[:] = pixels.ravel()
+        del target
+    finally:
+        block.close()
+    return image.size
+
+
+class SharedImagePool:
+    """
+    Shared Image Pool
+    -----------------
+    - jobs          - worker processes (0 = all cores)
+    - max_in_flight - renders queued or running at once (default 2 * jobs)
+    - blocks are reused across renders, at most max_in_flight + 1 exist
+      (one per render in flight and the one held by the caller)
+    - a dropped block stays mapped until images still wrapping it are
+      released (see close_released_blocks)
+    - only png specs (single images) are supported
+    - close (or with block) shuts workers down and frees all blocks
+    """
+
+    def __init__(self, jobs: int = 0, max_in_flight: Optional[int] = None):
+        workers = jobs or os.cpu_count() or 1
+        self.max_in_flight = max_in_flight or 2 * workers
+        self.executor = ProcessPoolExecutor(workers)
+
+        self._free: List[shared_memory.SharedMemory] = []
+        self._blocks: List[shared_memory.SharedMemory] = []
+
+    def __enter__(self) -> "SharedImagePool":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Shut down workers and unlink blocks
+        Blocks still wrapped by an image are closed once it is released
+        """
+        self.executor.shutdown(wait=True)
+        for block in list(self._blocks):
+            self._drop(block)
+        self._free.clear()
+
+    def render_images(
+        self, specs: Iterable[RenderSpec]
+    ) -> Iterator[Tuple[RenderSpec, PILImage]]:
+        """
+        Render specs and yield (spec, image) in completion order
+        --------------------------------------------------------
+        - image wraps a shared block without copying, it is only valid
+          until the next result is requested (copy it to keep it)
+        - specs are pulled lazily, like stream.render_many
+        - first failing render raises, pending renders are cancelled
+        """
+        spec_iter = iter(specs)
+        in_flight: Dict[Future, Tuple[RenderSpec, shared_memory.SharedMemory]] = {}
+        leased: Optional[shared_memory.SharedMemory] = None
+
+        try:
+            while True:
+                # top up to limit
+                count = self.max_in_flight - len(in_flight)
+                for spec in itertools.islice(spec_iter, count):
+                    block = self._lease(spec.size * spec.size * BYTES_PER_PIXEL)
+                    future = self.executor.submit(render_into, spec, block.name)
+                    in_flight[future] = (spec, block)
+
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    spec, block = in_flight.pop(future)
+                    try:
+                        size = future.result()
+                    except BaseException:
+                        # render is done, its block can be reused
+                        self._free.append(block)
+                        raise
+
+                    # previous image is no longer valid, reuse its block
+                    if leased is not None:
+                        self._free.append(leased)
+                    leased = block
+
+                    image = Image.frombuffer(
+                        "RGBA", size, block.buf, "raw", "RGBA", 0, 1  # type: ignore
+                    )
+                    yield spec, image
+
+        finally:
+            for future in in_flight:
+                future.cancel()
+            # blocks of cancelled / running renders are only freed once done
+            wait(in_flight)
+            self._free.extend(block for _, block in in_flight.values())
+            if leased is not None:
+                self._free.append(leased)
+
+    def _lease(self, nbytes: int) -> shared_memory.SharedMemory:
+        """
+        Get free block of at least nbytes (smallest fit)
+        A new block replaces a free one that is too small, so block
+        count never grows past renders in flight + 1
+        """
+        fits = [block for block in self._free if block.size >= nbytes]
+        if fits:
+            block = min(fits, key=lambda block: block.size)
+            self._free.remove(block)
+            return block
+
+        if self._free:
+            self._drop(self._free.pop())
+        block = shared_memory.SharedMemory(create=True, size=nbytes)
+        self._blocks.append(block)
+        return block
+
+    def _drop(self, block: shared_memory.SharedMemory):
+        """
+        Unlink block and close it, or keep it open (pending close) while
+        an image still wraps it
+        """
+        self._blocks.remove(block)
+        block.unlink()
+        close_released_blocks()
+        try:
+            block.close()
+        except BufferError:
+            with _PENDING_LOCK:
+                _PENDING_CLOSE.append(block)
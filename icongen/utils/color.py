@@ -1,65 +1,84 @@
-from typing import cast, Tuple, Union, Iterable
+from typing import cast, Iterable, Optional, Sequence, Tuple, Union
 
 import re
 import math
+import functools
+from abc import abstractmethod, ABC
+
+import numpy as np  # type: ignore
+
+from .css_colors import CSS_COLORS
 
 
 Number = Union[int, float]
 RGBATuple = Tuple[int, int, int, int]
 ColorOptions = Union[str, Iterable, Number]
+ColorStop = Tuple[float, ColorOptions]
+Box = Tuple[int, int, int, int]
+
+
+# hex code digits (3, 4, 6 or 8)
+HEX_PATTERN = re.compile(r"#([0-9a-f]{3,4}|[0-9a-f]{6}|[0-9a-f]{8})")
+
+# rgb() / rgba() functional notation
+# comma separated (css3) or space separated with "/ alpha" (css4)
+_ARG = r"\s*([+-]?(?:\d+\.?\d*|\.\d+)(?:e[+-]?\d+)?%?)\s*"
+FUNC_PATTERN = re.compile(
+    rf"rgba?\({_ARG},{_ARG},{_ARG}(?:,{_ARG})?\)"
+    rf"|rgba?\({_ARG}\s{_ARG}\s{_ARG}(?:/{_ARG})?\)"
+)
+
 
+def _channel(arg: str, scale: float) -> int:
+    """ Convert number or percentage to channel value, clamped to 0-255 """
+    value = float(arg[:-1]) * 255 / 100 if arg.endswith("%") else float(arg) * scale
+    return min(max(round(value), 0), 255)
 
+
+@functools.lru_cache(maxsize=1024)
 def parse_color(color_str: str, alpha: int = 255) -> RGBATuple:
     """
     Parse color string.
     alpha parameter is used if color string does not specify it.
-    Returns tuple (r, g, b, a).
+    Returns tuple (r, g, b, a), memoized per (color_str, alpha).
 
     Formats supported -
-    - Names [ white | black | transparent ]
+    - Names [ transparent | css named colors (see css_colors) ]
     - Hex codes [ #rgb | #rgba | #rrggbb | #rrggbbaa ]
+    - Functions [ rgb(r, g, b) | rgba(r, g, b, a) | rgb(r g b / a) ]
+      channels 0-255 or percentage, alpha 0-1 or percentage
     """
 
     # case independent parsing
-    color_str = color_str.lower()
+    color_str = color_str.strip().lower()
 
     # named colors
-    named_colors = {
-        "white": (255, 255, 255, alpha),
-        "black": (0, 0, 0, alpha),
-        "transparent": (0, 0, 0, 0),
-    }
-    if color_str in named_colors:
-        return named_colors[color_str]
-
-    # 3 digit hex code
-    if re.match("#[a-f0-9]{3}$", color_str):
-        r = int(color_str[1] * 2, 16)
-        g = int(color_str[2] * 2, 16)
-        b = int(color_str[3] * 2, 16)
+    if color_str == "transparent":
+        return (0, 0, 0, 0)
+    if color_str in CSS_COLORS:
+        r, g, b = CSS_COLORS[color_str]
         return (r, g, b, alpha)
 
-    # 4 digit hex code
-    if re.match("#[a-f0-9]{4}$", color_str):
-        r = int(color_str[1] * 2, 16)
-        g = int(color_str[2] * 2, 16)
-        b = int(color_str[3] * 2, 16)
-        a = int(color_str[4] * 2, 16)
+    # hex codes
+    match = HEX_PATTERN.fullmatch(color_str)
+    if match:
+        digits = match.group(1)
+        if len(digits) <= 4:
+            channels = [int(digit * 2, 16) for digit in digits]
+        else:
+            channels = [int(digits[i : i + 2], 16) for i in range(0, len(digits), 2)]
+        if len(channels) == 3:
+            channels.append(alpha)
+        r, g, b, a = channels
         return (r, g, b, a)
 
-    # 6 digit hex code
-    if re.match("#[a-f0-9]{6}$", color_str):
-        r = int(color_str[1:3], 16)
-        g = int(color_str[3:5], 16)
-        b = int(color_str[5:7], 16)
-        return (r, g, b, alpha)
-
-    # 8 digit hex code
-    if re.match("#[a-f0-9]{8}$", color_str):
-        r = int(color_str[1:3], 16)
-        g = int(color_str[3:5], 16)
-        b = int(color_str[5:7], 16)
-        a = int(color_str[7:9], 16)
+    # functional notation
+    match = FUNC_PATTERN.fullmatch(color_str)
+    if match:
+        groups = match.groups()
+        args = groups[:4] if groups[0] is not None else groups[4:]
+        r, g, b = (_channel(arg, 1) for arg in args[:3])
+        a = alpha if args[3] is None else _channel(args[3], 255)
         return (r, g, b, a)
 
     raise ValueError(f"cannot parse color - {color_str}")
@@ -123,32 +142,157 @@ class Color:
         return Color(blend_rgba[:-1], blend_rgba[-1])
 
 
-class LinearGradient:
-    def __init__(self, col1: ColorOptions, col2: ColorOptions, direction: Number = 0):
-        self.color1 = Color(col1)
-        self.color2 = Color(col2)
+class Gradient(ABC):
+    """
+    Gradient
+    --------
+    Color field over a w x h canvas, computed in one vectorized pass
+    - stops - (offset 0-1, color) pairs, interpolated linearly in between
+    - scale - None for even spacing, else sigmoid spacing of that steepness
+              (end stops are approached but never reached)
+    Subclasses map pixel coordinates to a position (0-1) between stops
+    Baked fields are memoized by gradient parameters and size
+    """
+
+    # samples in color lookup table
+    TABLE_SIZE = 4096
+
+    def __init__(self, stops: Sequence[ColorStop], scale: Optional[float] = None):
+        if len(stops) < 2:
+            raise ValueError("gradient needs at least 2 stops")
+
+        stops = sorted(stops, key=lambda stop: stop[0])
+        self.offsets = tuple(float(offset) for offset, _ in stops)
+        self.colors = tuple(Color(col).rgba for _, col in stops)
+        self.scale = scale
+
+    @abstractmethod
+    def positions(self, w: int, h: int, box: Optional[Box] = None) -> np.ndarray:
+        """
+        Get float array of gradient positions for w x h field (abstract)
+        box (left, top, right, bottom) limits it to that region
+        """
+        pass
+
+    def params(self) -> tuple:
+        """ Get hashable parameters (cache key) """
+        return (type(self).__name__, self.offsets, self.colors, self.scale)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Gradient) and self.params() == other.params()
+
+    def __hash__(self) -> int:
+        return hash(self.params())
+
+    def calculate_field(self, w: int, h: int) -> np.ndarray:
+        """
+        Get colors for the whole w x h field at once.
+        Returns read only uint8 array of shape (h, w, 4), shared between calls.
+        """
+        return _bake_field(self, w, h)
+
+    def calculate_region(self, w: int, h: int, box: Box) -> np.ndarray:
+        """
+        Get colors for box (left, top, right, bottom) of w x h field.
+        Not memoized, for rendering large fields in tiles.
+        """
+        return self._bake(w, h, box)
+
+    def color_table(self) -> np.ndarray:
+        """
+        Get (TABLE_SIZE, 4) uint8 colors sampled evenly over positions 0-1
+        Steps are far below one channel level, so lookups show no banding
+        """
+        position = np.linspace(0.0, 1.0, self.TABLE_SIZE)
+
+        # sigmoid spacing, centered on the middle of the field
+        if self.scale is not None:
+            adj = 2.0 * self.scale * (position - 0.5)
+            position = (1 + adj / np.sqrt(1 + adj * adj)) / 2
+
+        channels = [
+            np.interp(position, self.offsets, vals) for vals in zip(*self.colors)
+        ]
+        return np.rint(np.stack(channels, axis=-1)).astype(np.uint8)
+
+    def _bake(self, w: int, h: int, box: Optional[Box] = None) -> np.ndarray:
+        scaled = self.positions(w, h, box) * (self.TABLE_SIZE - 1)
+        index = np.rint(np.clip(scaled, 0, self.TABLE_SIZE - 1)).astype(np.intp)
+        return self.color_table()[index]
+
+
+class LinearGradient(Gradient):
+    """
+    Linear Gradient
+    ---------------
+    Stops run along direction (degrees, 0 = left to right, 90 = top to bottom)
+    Offset 0 is the canvas corner furthest back along direction
+    """
+
+    def __init__(
+        self,
+        stops: Sequence[ColorStop],
+        direction: Number = 0,
+        scale: Optional[float] = None,
+    ):
+        super().__init__(stops, scale)
         self.direction = direction
 
-    def bake(self, w: int, h: int, scale=1.0, resolution=100):
-        # constant [deps: direction]
-        self._cos_t = math.cos(math.radians(self.direction))
-        self._sin_t = math.sin(math.radians(self.direction))
-
-        # constant [deps: w, h, direction, multiplier]
-        max_r = w * self._cos_t + h * self._sin_t
-        k = 2.0 * scale / max_r
-
-        # function to get color from r
-        def blender(r):
-            r_adj = k * (r - max_r / 2)
-            blend_fac = (1 + r_adj / math.sqrt(1 + r_adj ** 2)) / 2
-            return Color.blend(self.color1, self.color2, blend_fac).rgba
-
-        # construct table with discrete chunks for color lookup
-        # given r -> obtain color
-        linspace = [i * max_r / resolution for i in range(resolution + 1)]
-        color_cache = list(map(blender, linspace))
-        self._col_lookup = lambda r: color_cache[round(r * resolution / max_r)]
-
-    def calculate2D(self, x: int, y: int) -> RGBATuple:
-        return self._col_lookup(x * self._cos_t + y * self._sin_t)
+    @classmethod
+    def two_color(
+        cls, col1: ColorOptions, col2: ColorOptions, direction: Number = 0
+    ) -> "LinearGradient":
+        """ Soft two color gradient (col2 at start, col1 at end of direction) """
+        return cls([(0.0, col2), (1.0, col1)], direction, scale=1.0)
+
+    def params(self) -> tuple:
+        return super().params() + (self.direction,)
+
+    def positions(self, w: int, h: int, box: Optional[Box] = None) -> np.ndarray:
+        cos_t = math.cos(math.radians(self.direction))
+        sin_t = math.sin(math.radians(self.direction))
+
+        # projection along direction, spanning canvas corners
+        left, top, right, bottom = box or (0, 0, w, h)
+        y, x = np.ogrid[top:bottom, left:right]
+        r = x * cos_t + y * sin_t
+        r_min = min(0.0, w * cos_t) + min(0.0, h * sin_t)
+        r_max = max(0.0, w * cos_t) + max(0.0, h * sin_t)
+        return (r - r_min) / (r_max - r_min)
+
+
+class RadialGradient(Gradient):
+    """
+    Radial Gradient
+    ---------------
+    Stops run outwards from center (fractions of canvas size)
+    radius is a fraction of canvas width, offset 1 is reached there
+    """
+
+    def __init__(
+        self,
+        stops: Sequence[ColorStop],
+        center: Tuple[float, float] = (0.5, 0.5),
+        radius: float = 0.5,
+        scale: Optional[float] = None,
+    ):
+        super().__init__(stops, scale)
+        self.center = tuple(center)
+        self.radius = radius
+
+    def params(self) -> tuple:
+        return super().params() + (self.center, self.radius)
+
+    def positions(self, w: int, h: int, box: Optional[Box] = None) -> np.ndarray:
+        # pixel centers, symmetric around center
+        left, top, right, bottom = box or (0, 0, w, h)
+        y, x = np.ogrid[top + 0.5 : bottom, left + 0.5 : right]
+        dist = np.hypot(x - self.center[0] * w, y - self.center[1] * h)
+        return dist / (self.radius * w)
+
+
+@functools.lru_cache(maxsize=16)
+def _bake_field(gradient: Gradient, w: int, h: int) -> np.ndarray:
+    field = gradient._bake(w, h)
+    field.setflags(write=False)
+    return field
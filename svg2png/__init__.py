@@ -4,4 +4,6 @@
 
 # svg2png
 # ├─ parser
+# ├─ compiled
+# ├─ instrument
 # └─ vector
@@ -0,0 +1,159 @@
+# Compiled Module
+# -----------------
+# Binary cache for parsed svg files
+# Stores DrawableObjectStore as flat arrays, loaded through mmap
+
+# layout (little endian)
+# ├─ header        - magic, version, source sha256, canvas, counts
+# ├─ point_offsets - uint32[paths + 1]   (index into points)
+# ├─ sub_offsets   - uint32[paths + 1]   (index into sub_starts)
+# ├─ sub_starts    - uint32[subpaths]    (start point within path)
+# ├─ coords        - float64[points * 2] (x, y interleaved)
+# ├─ kinds         - uint8[points]       (DrawablePath point kinds)
+# └─ strings       - utf-8, one "id<TAB>fill<TAB>fill-rule" line per path
+
+from typing import Optional
+
+import os
+import struct
+import hashlib
+import threading
+
+import numpy as np  # type: ignore
+
+from . import vector
+
+
+# bump when parser output or layout changes
+FORMAT_VERSION = 6
+
+MAGIC = b"SVGC"
+HEADER = struct.Struct("<4sI32sffIIII")
+CACHE_DIRNAME = "__svgcache__"
+
+
+def source_digest(filename: str) -> bytes:
+    """ Get sha256 digest of source file contents """
+    with open(filename, "rb") as src_file:
+        return hashlib.sha256(src_file.read()).digest()
+
+
+def cache_path(filename: str) -> str:
+    """ Get compiled file path (inside __svgcache__ next to source) """
+    src_dir, src_name = os.path.split(filename)
+    return os.path.join(src_dir, CACHE_DIRNAME, f"{src_name}c")
+
+
+def dump_store(store: vector.DrawableObjectStore, filename: str, digest: bytes):
+    """
+    Write render list of store to compiled file
+    Silently skipped if store has unsupported drawables or file is not writable
+    """
+
+    # only paths are supported
+    if not all(isinstance(drw, vector.DrawablePath) for drw in store):
+        return
+
+    point_offsets = [0]
+    sub_offsets = [0]
+    for drw in store:
+        point_offsets.append(point_offsets[-1] + len(drw.kinds))
+        sub_offsets.append(sub_offsets[-1] + len(drw.subpath_starts))
+
+    strings = [
+        f"{drw.elem_id}\t{drw.style.fillcolor}\t{drw.style.fillrule}" for drw in store
+    ]
+    string_bytes = "\n".join(strings).encode()
+
+    header = HEADER.pack(
+        MAGIC,
+        FORMAT_VERSION,
+        digest,
+        store.canvas_size.x,
+        store.canvas_size.y,
+        len(store),
+        sub_offsets[-1],
+        point_offsets[-1],
+        len(string_bytes),
+    )
+
+    # write to temp file and move in place (atomic)
+    temp_filename = f"{filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with open(temp_filename, "wb") as out_file:
+            out_file.write(header)
+            out_file.write(np.array(point_offsets, dtype="<u4").tobytes())
+            out_file.write(np.array(sub_offsets, dtype="<u4").tobytes())
+            for drw in store:
+                out_file.write(np.asarray(drw.subpath_starts, dtype="<u4").tobytes())
+            for drw in store:
+                out_file.write(np.asarray(drw.coords, dtype="<f8").tobytes())
+            for drw in store:
+                out_file.write(np.asarray(drw.kinds, dtype=np.uint8).tobytes())
+            out_file.write(string_bytes)
+        os.replace(temp_filename, filename)
+    except OSError:
+        pass
+
+
+def load_store(filename: str, digest: bytes) -> Optional[vector.DrawableObjectStore]:
+    """
+    Load store from compiled file
+    Returns None if file is missing, stale or invalid
+    Path geometry are read only views into the mapped file
+    """
+
+    try:
+        buffer = np.memmap(filename, dtype=np.uint8, mode="r")
+    except (OSError, ValueError):
+        return None
+
+    # validate header
+    if len(buffer) < HEADER.size:
+        return None
+    header = HEADER.unpack(bytes(buffer[: HEADER.size]))
+    magic, version, src_digest, canvas_w, canvas_h = header[:5]
+    n_paths, n_subs, n_points, n_string = header[5:]
+    if (magic, version, src_digest) != (MAGIC, FORMAT_VERSION, digest):
+        return None
+
+    # reject truncated or corrupt files
+    data_size = 4 * (2 * n_paths + 2 + n_subs) + 17 * n_points + n_string
+    if len(buffer) != HEADER.size + data_size:
+        return None
+
+    # views into mapped file
+    offset = HEADER.size
+    point_offsets = np.frombuffer(buffer, "<u4", n_paths + 1, offset)
+    offset += point_offsets.nbytes
+    sub_offsets = np.frombuffer(buffer, "<u4", n_paths + 1, offset)
+    offset += sub_offsets.nbytes
+    sub_starts = np.frombuffer(buffer, "<u4", n_subs, offset)
+    offset += sub_starts.nbytes
+    coords = np.frombuffer(buffer, "<f8", n_points * 2, offset)
+    offset += coords.nbytes
+    kinds = np.frombuffer(buffer, np.uint8, n_points, offset)
+    offset += kinds.nbytes
+    strings = bytes(buffer[offset : offset + n_string]).decode().split("\n")
+
+    # rebuild drawables
+    store = vector.DrawableObjectStore((int(canvas_w), int(canvas_h)))
+    point_bounds = point_offsets.tolist()
+    sub_bounds = sub_offsets.tolist()
+    for i, line in enumerate(strings[:n_paths]):
+        elem_id, fillcolor, fillrule = line.split("\t")
+        drw = vector.DrawablePath(elem_id)
+        drw.style.fillcolor = fillcolor
+        drw.style.fillrule = fillrule
+
+        start, end = point_bounds[i], point_bounds[i + 1]
+        # arrays share buffer protocol with DrawablePath array storage
+        drw.coords = coords[2 * start : 2 * end]  # type: ignore
+        drw.kinds = kinds[start:end]  # type: ignore
+        drw.subpath_starts = sub_starts[sub_bounds[i] : sub_bounds[i + 1]]  # type: ignore
+
+        # ids are only needed while parsing (<use>), not for drawing
+        store.append("", drw)
+
+    return store
@@ -0,0 +1,164 @@
+# Instrument Module
+# -----------------
+# Opt-in stage timings and counters for parse / render pipelines
+# Nothing is recorded (or timed) unless a recording is active
+
+# with instrument.recording() as rec:
+#     render_svg(...)
+# rec.report() -> {"stages": {name: ms}, "counters": {name: value}}
+
+# buffer memory (images and arrays alive together)
+# ├─ peak_buffers - sizes the buffers passed in, adds held bytes, keeps max
+# └─ holding      - counts buffers of a caller as held while a callee runs
+
+from typing import Callable, Dict, Iterator, Optional
+
+import time
+import contextlib
+from contextvars import ContextVar
+
+
+class Recorder:
+    """
+    Recorder
+    --------
+    - stages     - summed wall time per stage name (seconds)
+    - counters   - summed counts (count) or maxima (peak) per name
+    - held_bytes - buffer bytes held by callers (see holding)
+    Active per thread / task (contextvars), so concurrent renders
+    record into their own recorder
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+
+        # bytes of buffers held by callers further up (see holding)
+        self.held_bytes = 0
+
+    def add_time(self, name: str, seconds: float):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def count(self, name: str, value: int):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def peak(self, name: str, value: int):
+        self.counters[name] = max(self.counters.get(name, 0), value)
+
+    def total(self) -> float:
+        """ Get summed time of all stages (seconds) """
+        return sum(self.stages.values())
+
+    def report(self) -> dict:
+        """ Get picklable summary, stage times in ms """
+        return {
+            "stages": {name: sec * 1000 for name, sec in self.stages.items()},
+            "counters": dict(self.counters),
+        }
+
+
+_ACTIVE: ContextVar[Optional[Recorder]] = ContextVar("recorder", default=None)
+
+
+def active() -> Optional[Recorder]:
+    """ Get recorder of current context, None if not recording """
+    return _ACTIVE.get()
+
+
+@contextlib.contextmanager
+def recording(
+    callback: Optional[Callable[[Recorder], None]] = None,
+) -> Iterator[Recorder]:
+    """
+    Record stages and counters of everything run inside block
+    callback (if given) gets the recorder when block exits
+    """
+    recorder = Recorder()
+    token = _ACTIVE.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _ACTIVE.reset(token)
+    if callback:
+        callback(recorder)
+
+
+@contextlib.contextmanager
+def stage(name: str) -> Iterator[None]:
+    """ Time block as stage name (no-op unless recording) """
+    recorder = _ACTIVE.get()
+    if recorder is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.add_time(name, time.perf_counter() - start)
+
+
+def count(name: str, value: int):
+    """ Add value to counter name (no-op unless recording) """
+    recorder = _ACTIVE.get()
+    if recorder is not None:
+        recorder.count(name, value)
+
+
+def peak(name: str, value: int):
+    """ Keep maximum of counter name (no-op unless recording) """
+    recorder = _ACTIVE.get()
+    if recorder is not None:
+        recorder.peak(name, value)
+
+
+def buffer_bytes(*buffers) -> int:
+    """
+    Get bytes held by images and arrays (None entries are skipped)
+    Array views count their base array once
+    """
+    total = 0
+    seen = set()
+    for buf in buffers:
+        if buf is None:
+            continue
+
+        # arrays (views resolved to the array owning the memory)
+        if hasattr(buf, "nbytes"):
+            while getattr(getattr(buf, "base", None), "nbytes", None) is not None:
+                buf = buf.base
+            if id(buf) not in seen:
+                seen.add(id(buf))
+                total += buf.nbytes
+
+        # pillow images (multi band modes store 4 bytes per pixel)
+        else:
+            w, h = buf.size
+            total += w * h * (1 if buf.mode in ("1", "L", "P") else 4)
+    return total
+
+
+def peak_buffers(name: str, *buffers):
+    """
+    Keep maximum of bytes held by buffers alive together, plus bytes held
+    by callers (no-op unless recording)
+    """
+    recorder = _ACTIVE.get()
+    if recorder is not None:
+        recorder.peak(name, recorder.held_bytes + buffer_bytes(*buffers))
+
+
+@contextlib.contextmanager
+def holding(*buffers) -> Iterator[None]:
+    """ Count buffers as alive in every peak_buffers inside block """
+    recorder = _ACTIVE.get()
+    if recorder is None:
+        yield
+        return
+
+    held = buffer_bytes(*buffers)
+    recorder.held_bytes += held
+    try:
+        yield
+    finally:
+        recorder.held_bytes -= held
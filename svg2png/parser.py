@@ -4,18 +4,18 @@
 # Limited tag support
 
 
-from typing import Optional, Union
-from typing import Tuple, List, Iterable, Any
+from typing import Optional, NamedTuple
+from typing import Tuple, List, Iterator, Any
 
-from copy import deepcopy
 import xml.etree.ElementTree as elemtree
 import re
 
 from . import vector
+from . import compiled
+from . import instrument
 
 
 # type hints
-Element = elemtree.Element
 FloatPair = Tuple[float, float]
 
 
@@ -27,305 +27,318 @@ def pair_coords(coord_list: List[float]) -> List[FloatPair]:
 
 # SUBPARSERS
 # =================
+
+# regular pattern for parsing numbers
+NUM_RE = r"[-+]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?"
+num_pattern = re.compile(NUM_RE)
+
+# path token is either a command letter or a number
+path_token_pattern = re.compile(rf"([A-DF-Za-df-z])|({NUM_RE})")
+
+# number of arguments consumed by each path command
+path_arg_count = {"M": 2, "Z": 0, "L": 2, "H": 1, "V": 1, "C": 6}
+
+
 def parse_coords(coord_str: str) -> List[float]:
     """
     Parse 2D coordinate string
     --------------------------
     - Returns list of floats on success
     """
+    return list(map(float, num_pattern.findall(coord_str)))
+
+
+def tokenize_svg_path(command_str: str) -> Iterator[Tuple[str, List[float]]]:
+    """
+    Tokenize svg <path> command string in a single pass
+    Yields (command, arguments) for every command letter
+    """
+
+    command = ""
+    arguments: List[float] = []
+
+    for command_tok, number_tok in path_token_pattern.findall(command_str):
+        if number_tok:
+            arguments.append(float(number_tok))
+            continue
+
+        if command:
+            yield command, arguments
+        command = command_tok
+        arguments = []
 
-    # regular pattern for parsing numbers
-    num_re = r"[-+]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?"
-    point_list = list(map(float, re.findall(num_re, coord_str)))
-    return point_list
+    if command:
+        yield command, arguments
 
 
 def parse_svg_path(command_str: str, path: vector.DrawablePath):
     """
     Parse svg <path> command string
     Traverse using DrawablePath inbuilt commands
+    Repeated argument groups repeat the command (moveto repeats as lineto)
     """
 
-    # temp storages
-    command = ""
-    argument = ""
-
-    # adding a semicolon as string end marker
-    # helps register last command before loop is over
-    command_str += ";"
+    for command, arguments in tokenize_svg_path(command_str):
 
-    # supported commands
-    supported_commands = set("MZ;LHV;C")
+        command_upper = command.upper()
+        relative = command.islower()
 
-    # parse each char one by one
-    for char in command_str:
-
-        # CHAD command
-        # ------------------
-        # - register previous command + argument
-        # - reset prev args and setup next
-        if char.upper() in supported_commands:
+        # unknown command -> skip with its arguments
+        if command_upper not in path_arg_count:
+            print(f"{command} command not supported")
+            continue
 
-            command_upper = command.upper()
+        # closepath takes no arguments
+        if command_upper == "Z":
+            path.closepath()
+            continue
 
-            # no registered command -> skip
-            if not command:
-                pass
+        # split into groups, incomplete trailing group is dropped
+        count = path_arg_count[command_upper]
+        for i in range(0, len(arguments) - count + 1, count):
+            args = arguments[i : i + count]
 
             # path utils
             # ---------------------
-            elif command_upper == "M":
-                coord_list = parse_coords(argument)
-                dest = pair_coords(coord_list)[0]
-                path.moveto(dest, rel=command.islower())
-
-            elif command_upper == "Z":
-                path.closepath()
+            if command_upper == "M":
+                path.moveto((args[0], args[1]), rel=relative)
+                command_upper = "L"
 
             # straight lines
             # ---------------------
             elif command_upper == "L":
-                coord_list = parse_coords(argument)
-                dest = pair_coords(coord_list)[0]
-                path.lineto(dest, rel=command.islower())
+                path.lineto((args[0], args[1]), rel=relative)
 
             elif command_upper == "H":
-                coord_list = parse_coords(argument)
-                dest_x = coord_list[0]
-                dest_x -= path.current_pos[0] if command.isupper() else 0
+                dest_x = args[0]
+                dest_x -= 0 if relative else path.current_pos[0]
                 path.lineto((dest_x, 0), rel=True)
 
             elif command_upper == "V":
-                coord_list = parse_coords(argument)
-                dest_y = coord_list[0]
-                dest_y -= path.current_pos[1] if command.isupper() else 0
+                dest_y = args[0]
+                dest_y -= 0 if relative else path.current_pos[1]
                 path.lineto((0, dest_y), rel=True)
 
             # bezier curves
             # ---------------------
             elif command_upper == "C":
-                coord_list = parse_coords(argument)
-                h1, h2, dest = pair_coords(coord_list)
-                path.curveto(h1, h2, dest, rel=command.islower())
+                h1, h2, dest = pair_coords(args)
+                path.curveto(h1, h2, dest, rel=relative)
 
-            # end
-            # ---------------------
-            else:
-                print(f"{command} command not supported")
 
-            # setup next command
-            command = char
-            argument = ""
+# SVG PARSER
+# =================
 
-        # VIRGIN argument
-        # ------------------
-        # - just keep appending to argument
-        # - depends on next command to make sense of it
-        else:
-            argument += char
+# svg versions parsed without warning
+SUPPORTED_SVG_VERSIONS = ["1.1"]
 
+# bytes fed to the xml parser at a time
+PARSE_CHUNK_SIZE = 2 ** 16
 
-# SVG PARSER
-# =================
-class TreeIter:
-    def __init__(self, root: Element):
-        self.root = root
-
-        self.iter_stack: List[tuple] = []
-        self.iter_start = False
-
-    def clean_tag(self, tag: str) -> str:
-        """ Get the tag name without namespace """
-        pattern = "{.*}\s*"
-        return re.sub(pattern, "", tag)
-
-    def __iter__(self):
-        self.iter_start = True
-        self.root.tag = self.clean_tag(self.root.tag)
-        self.iter_stack = [(self.root, self.root[::-1])]
-        return self
-
-    def __next__(self):
-
-        # first time iter stack init
-        if self.iter_start:
-            self.iter_start = False
-            return self.root, "entry"
-
-        # continue
-        while self.iter_stack:
-            top_elem, children = self.iter_stack[-1]
-
-            # child exists -> pop and go to next level
-            if children:
-                child = children.pop()
-                child.tag = self.clean_tag(child.tag)
-                self.iter_stack.append((child, child[::-1]))
-                return child, "entry"
-
-            # done -> go backwards
-            else:
-                parent, _ = self.iter_stack.pop()
-                return parent, "exit"
 
-        raise StopIteration
+class ElemProp(NamedTuple):
+    """
+    Element Properties
+    ------------------
+    Inherited state of an element, immutable so children share their
+    parent's props (and style) until they change something
+    - define_mode - inside <defs> (drawables are not rendered)
+    - style       - inherited drawable style
+    """
 
-    def skip(self):
-        """
-        Skip all children of last element (recursive)
-        ---------------------------------------------
-        used when an element handles children itself
-        also skips exit event for last event
-        note: cannot skip root <svg>
-        """
-        len_now = len(self.iter_stack)
-        while len(self.iter_stack) >= len_now:
-            next(self)
+    define_mode: bool
+    style: vector.DrawableStyle
 
+    @classmethod
+    def create(cls, attribs: dict) -> "ElemProp":
+        """ Build root props from <svg> attribs """
+        return cls(define_mode=False, style=vector.DrawableStyle(attribs))
 
-class ElemProp:
-    def __init__(self, attribs: dict):
-        # flags
-        self.define_mode = False
+    def updated(self, attribs: dict) -> "ElemProp":
+        """ Get props with style attribs of element applied """
+        style = self.style.updated(attribs)
+        return self if style is self.style else self._replace(style=style)
 
-        # style
-        self.style = vector.DrawableStyle(attribs)
 
-    def copy(self) -> "ElemProp":
-        return deepcopy(self)
+def clean_tag(tag: str) -> str:
+    """ Get the tag name without namespace """
+    return tag.rpartition("}")[2]
 
 
-def get_svg_root(filename: str) -> Element:
+def check_svg_root(filename: str, tag: str, attribs: dict):
     """
-    Get root svg element from filename
-    Checks version support and validity
+    Check root element of filename
+    Raises on non svg files, warns on untested versions
     """
-    supported_svg_vers = ["1.1"]
-
-    tree = elemtree.parse(filename)
-    root = tree.getroot()
-    svgver = root.attrib.get("version", "")
-
-    # preliminary check
-    if not root.tag.endswith("svg"):
+    if tag != "svg":
         raise ValueError(f"file {filename} is not a valid svg file")
 
     # warn if svg version is not tested
+    svgver = attribs.get("version", "")
     if not svgver:
         print(f"warning: svg version not mentioned")
-    elif svgver not in supported_svg_vers:
+    elif svgver not in SUPPORTED_SVG_VERSIONS:
         print(f"warning: svg version {svgver} is not tested")
 
-    return root
-
 
-def svg_drawable_handler(elem: Element, prop: ElemProp) -> vector.Drawable:
+def svg_drawable_handler(tag: str, attribs: dict, prop: ElemProp) -> vector.Drawable:
     """
     Handle drawable elements
     Create drawable from element and attribs
     """
 
     drw: Any = None
-    elem_id = elem.attrib.get("id", "")
-    prop.style.update(elem.attrib)
+    elem_id = attribs.get("id", "")
+    prop = prop.updated(attribs)
 
     # <path>
     # parse path and store to render list
-    if elem.tag == "path":
+    if tag == "path":
         drw = vector.DrawablePath(elem_id)
-        drw.style = prop.style.copy()
-        parse_svg_path(elem.attrib["d"], drw)
+        drw.style = prop.style
+        parse_svg_path(attribs["d"], drw)
 
     return drw
 
 
-def parse_svg_file(filename: str) -> vector.DrawableObjectStore:
-
-    root = get_svg_root(filename)
-    namespace = re.findall(r"{.*}\s*", root.tag)[0].strip("{}")
-
-    viewbox = root.attrib.get("viewBox", "").split()
-
-    view_w, view_h = map(int, viewbox[2:])
-    canvas_size = (view_w, view_h)
-
-    # state storage
-    prop_stack: List[ElemProp] = []
-    draw_store = vector.DrawableObjectStore(canvas_size)
+class SVGBuilder:
+    """
+    SVG Builder
+    -----------
+    Target of xml parser, builds the drawable store straight from
+    start / end events, so no element tree is ever built
+    - tags are stripped of their namespace once, on start
+    - children of drawables, <use> and unsupported elements are
+      skipped by depth count only (their events are dropped)
+    """
 
     # tag list
     grouping_tags = ["svg", "defs", "g"]
     drawable_tags = ["path"]
 
-    # depth first tree iterator
-    iterator = TreeIter(root)
-    for elem, event in iterator:
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.draw_store: Optional[vector.DrawableObjectStore] = None
 
-        # exit event -> pop props
-        if event == "exit":
-            prop_stack.pop()
-            continue
+        # state storage
+        self.prop_stack: List[ElemProp] = []
+        self.skip_depth = 0
+
+    def start(self, tag: str, attribs: dict):
+        if self.skip_depth:
+            self.skip_depth += 1
+            return
+
+        tag = clean_tag(tag)
+        if self.draw_store is None:
+            self.draw_store = self._create_store(tag, attribs)
 
         # grouping elements
         # change state for children to inherit
-        if elem.tag in grouping_tags:
+        if tag in self.grouping_tags:
 
-            if elem.tag == "svg":
-                new_prop = ElemProp(elem.attrib)
-                prop_stack.append(new_prop)
+            if tag == "svg":
+                self.prop_stack.append(ElemProp.create(attribs))
 
-            elif elem.tag == "defs":
-                new_prop = prop_stack[-1].copy()
-                new_prop.define_mode = True
-                prop_stack.append(new_prop)
+            elif tag == "defs":
+                self.prop_stack.append(self.prop_stack[-1]._replace(define_mode=True))
 
-            elif elem.tag == "g":
-                new_prop = prop_stack[-1].copy()
-                new_prop.style.update(elem.attrib)
-                prop_stack.append(new_prop)
+            elif tag == "g":
+                self.prop_stack.append(self.prop_stack[-1].updated(attribs))
+
+            return
+
+        # everything else handles (or drops) its own children
+        self.skip_depth = 1
 
         # drawables
         # do not change states
-        elif elem.tag in drawable_tags:
+        if tag in self.drawable_tags:
 
-            # skip all children (recursive)
-            iterator.skip()
-
-            # get drawable element after updating props
-            prop = prop_stack[-1].copy()
-            drw = svg_drawable_handler(elem, prop)
+            # get drawable element (props of element only apply to it)
+            prop = self.prop_stack[-1]
+            drw = svg_drawable_handler(tag, attribs, prop)
 
             # append to draw store
             render = not prop.define_mode
-            draw_store.append(drw.elem_id, drw, render=render)
+            self.draw_store.append(drw.elem_id, drw, render=render)
 
         # tag an already defined vector and push it to render list
         # fails if there is no matching id
-        elif elem.tag == "use":
-
-            # skip exit event
-            iterator.skip()
+        elif tag == "use":
 
             # href to id linking
             href_finder = lambda x: x.endswith("href")
-            href_key = list(filter(href_finder, elem.attrib))[0]
-            href_id = elem.attrib[href_key].lstrip("#")
+            href_key = list(filter(href_finder, attribs))[0]
+            href_id = attribs[href_key].lstrip("#")
 
             # update property
-            prop = prop_stack[-1].copy()
-            prop.style.update(elem.attrib)
+            prop = self.prop_stack[-1].updated(attribs)
 
-            # get reference as copy
-            drw = draw_store.get(href_id).copy()
-            drw.elem_id = elem.attrib.get("id", "")
-            drw.style.update(prop.style.as_dict())
+            # instance shares geometry of reference, with its own style
+            drw = self.draw_store.get(href_id).copy()
+            drw.elem_id = attribs.get("id", "")
+            drw.style = drw.style.updated(prop.style.as_dict())
 
             # append to draw store
             render = not prop.define_mode
-            draw_store.append(drw.elem_id, drw, render=render)
+            self.draw_store.append(drw.elem_id, drw, render=render)
 
-        # fallback
+    def end(self, tag: str):
+        # exit event -> pop props
+        if self.skip_depth:
+            self.skip_depth -= 1
         else:
-            iterator.skip()
+            self.prop_stack.pop()
+
+    def close(self) -> vector.DrawableObjectStore:
+        if self.draw_store is None:
+            raise ValueError(f"file {self.filename} is not a valid svg file")
+        return self.draw_store
+
+    def _create_store(self, tag: str, attribs: dict) -> vector.DrawableObjectStore:
+        check_svg_root(self.filename, tag, attribs)
+
+        viewbox = attribs.get("viewBox", "").split()
+        view_w, view_h = map(int, viewbox[2:])
+        return vector.DrawableObjectStore((view_w, view_h))
+
+
+def parse_svg_file(filename: str, use_cache=True) -> vector.DrawableObjectStore:
+    """
+    Parse svg file into drawable store
+    Reuses compiled copy (see compiled module) while source is unchanged
+    """
+
+    with instrument.stage("parse"):
+        if not use_cache:
+            draw_store = _parse_svg_file(filename)
+
+        else:
+            # load compiled copy if source hash matches
+            digest = compiled.source_digest(filename)
+            compiled_path = compiled.cache_path(filename)
+            loaded = compiled.load_store(compiled_path, digest)
+
+            # parse and save compiled copy otherwise
+            if loaded is None:
+                draw_store = _parse_svg_file(filename)
+                compiled.dump_store(draw_store, compiled_path, digest)
+            else:
+                draw_store = loaded
+
+    if instrument.active():
+        paths = [drw for drw in draw_store if isinstance(drw, vector.DrawablePath)]
+        instrument.count("drawables", len(draw_store))
+        instrument.count("path_points", sum(len(drw.kinds) for drw in paths))
 
     return draw_store
+
+
+def _parse_svg_file(filename: str) -> vector.DrawableObjectStore:
+    """ Parse svg file as a stream of xml events (see SVGBuilder) """
+    parser = elemtree.XMLParser(target=SVGBuilder(filename))
+    with open(filename, "rb") as svg_file:
+        for chunk in iter(lambda: svg_file.read(PARSE_CHUNK_SIZE), b""):
+            parser.feed(chunk)
+    return parser.close()  # type: ignore
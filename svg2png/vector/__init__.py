@@ -5,7 +5,11 @@
 
 # vector
 # ├─ draw
-#    ├─ pillow@7.2.0
-#    └─ base
+# │  ├─ pillow@7.2.0
+# │  ├─ base
+# │  └─ coverage
+# └─ coverage
+#    └─ numpy
 
 from .draw import *
+from .coverage import CoverageSurface, coverage_mask, NONZERO, EVENODD
@@ -16,6 +16,8 @@ class Transform:
     - scale     - x and y multipliers
     """
 
+    __slots__ = ("translate", "scale")
+
     def __init__(self, translate: Pair = (0, 0), scale: Pair = (1, 1)):
         self.translate = float(translate[0]), float(translate[1])
         self.scale = float(scale[0]), float(scale[1])
@@ -32,6 +34,8 @@ class Point:
     - indexable (view only)
     """
 
+    __slots__ = ("x", "y")
+
     def __init__(self, coord: Pair):
         self.x, self.y = map(float, coord)
 
@@ -3,29 +3,72 @@
 # Functions and classes for drawing
 
 
-from typing import Optional, Union
+from typing import Any, Callable, FrozenSet, Optional, Union
 from typing import Tuple, List, Dict, Sequence
 
-from copy import deepcopy
+import copy
 from abc import abstractmethod, ABC
+from array import array
 
-from PIL import Image, ImageDraw  # type: ignore
+import numpy as np  # type: ignore
+from PIL import Image, ImageChops, ImageColor, ImageDraw  # type: ignore
 from PIL.Image import Image as PILImage  # type: ignore
 
+from .. import instrument
 from .base import Point, Transform
+from .coverage import CoverageSurface, sample_mask, NONZERO, EVENODD
 
 # type hints
 Number = Union[int, float]
 Pair = Tuple[Number, Number]
+FloatPair = Tuple[float, float]
+RGBATuple = Tuple[int, int, int, int]
+Recolor = Callable[[RGBATuple], RGBATuple]
+Surface = Union[PILImage, CoverageSurface]
+
+# max distance (device pixels) of flattened curve from true curve
+DEFAULT_FLATNESS = 0.25
+
+# rasterizer backends of draw_all
+# polygon  - aliased pillow polygons, winding sampled at pixel centers where
+#            contours overlap (supersample and downscale for aa)
+# coverage - fractional pixel coverage, anti-aliased at output size
+#            (exact for non-overlapping contours, approximate where they overlap)
+POLYGON = "polygon"
+COVERAGE = "coverage"
+BACKENDS = (POLYGON, COVERAGE)
 
 
 # DRAWABLE OBJECTS
 # =====================
+# attributes read by DrawableStyle
+STYLE_ATTRIBS = ("opacity", "fill-opacity", "fill", "fill-rule")
+
+
 class DrawableStyle:
+    """
+    Drawable Style
+    --------------
+    - never changed once shared, parser props, drawables and <use>
+      instances all point at the same style until an attribute changes it
+    - updated returns a changed copy, update is for styles not shared yet
+    - explicit - style attributes given so far (the rest are defaults)
+    """
+
     def __init__(self, attrib: dict = {}):
         self.fillcolor = ""
+        self.fillrule = NONZERO
+        self.explicit: FrozenSet[str] = frozenset()
         self.update(attrib)
 
+    def updated(self, attrib: dict) -> "DrawableStyle":
+        """ Get style with attrib applied (self if attrib has no style) """
+        if not any(key in attrib for key in STYLE_ATTRIBS):
+            return self
+        style = self.copy()
+        style.update(attrib)
+        return style
+
     def update(self, attrib: dict):
         """
         Updates style inplace
@@ -35,15 +78,25 @@ class DrawableStyle:
         fill_opa = float(attrib.get("fill-opacity", 1)) * tot_opa
         fill_col = attrib.get("fill", self.fillcolor) if fill_opa else ""
         self.fillcolor = fill_col
+        self.fillrule = attrib.get("fill-rule", self.fillrule)
+        self.explicit |= {key for key in STYLE_ATTRIBS if key in attrib}
 
     def as_dict(self) -> dict:
-        return {
-            "fill": self.fillcolor,
-            "fill-opacity": 1,
-        }
+        """
+        Get explicitly given style as attribs
+        Defaults are left out, so they never override the style they are
+        applied to (<use> instances keep fill and rule of their reference)
+        """
+        attrib: Dict[str, Any] = {}
+        if self.explicit & {"fill", "fill-opacity", "opacity"}:
+            attrib.update({"fill": self.fillcolor, "fill-opacity": 1})
+        if "fill-rule" in self.explicit:
+            attrib["fill-rule"] = self.fillrule
+        return attrib
 
     def copy(self) -> "DrawableStyle":
-        return deepcopy(self)
+        # fields are immutable strings
+        return copy.copy(self)
 
 
 class Drawable(ABC):
@@ -55,78 +108,340 @@ class Drawable(ABC):
         self.style = DrawableStyle(attrib)
 
     def copy(self):
-        return deepcopy(self)
+        """ Get drawable sharing style (and geometry) with this one """
+        return copy.copy(self)
+
+    def fill_color(self, recolor: Optional[Recolor] = None) -> Union[str, RGBATuple]:
+        """ Get fill of style, passed through recolor (as rgba) if given """
+        fillcol = self.style.fillcolor
+        if recolor is None or not fillcol:
+            return fillcol
+        return recolor(ImageColor.getcolor(fillcol, "RGBA"))  # type: ignore
 
     @abstractmethod
-    def draw(self, imdraw: ImageDraw, transform=Transform()):
-        """ Handle drawing on surface (abstract) """
+    def draw(
+        self,
+        surface: Surface,
+        transform=Transform(),
+        flatness=DEFAULT_FLATNESS,
+        origin: Optional[Tuple[int, int]] = None,
+        recolor: Optional[Recolor] = None,
+    ) -> int:
+        """
+        Handle drawing on surface (abstract)
+        surface - rgba image, or CoverageSurface for coverage backend
+        origin  - canvas pixel at surface (0, 0) when drawing in tiles
+        recolor - maps rgba fill to the rgba actually drawn
+        Returns number of vertices drawn
+        """
         pass
 
 
+# point kinds in DrawablePath geometry
+VERTEX = 0
+CURVE_HANDLE1 = 1
+CURVE_HANDLE2 = 2
+CURVE_DEST = 3
+
+
+def contours_disjoint(points: np.ndarray, offsets: np.ndarray) -> bool:
+    """
+    Check if no two closable contours (more than 2 points) have
+    overlapping bounding boxes, so no fill rule can tell them apart
+    """
+    if len(offsets) <= 2:
+        return True
+    closable = np.diff(offsets) > 2
+    if np.count_nonzero(closable) <= 1:
+        return True
+    low = np.minimum.reduceat(points, offsets[:-1])[closable]
+    high = np.maximum.reduceat(points, offsets[:-1])[closable]
+    overlap = np.all(
+        (low[:, None] < high[None, :]) & (low[None, :] < high[:, None]), axis=-1
+    )
+    np.fill_diagonal(overlap, False)
+    return not overlap.any()
+
+
+# longest contour checked for self crossings (edge pairs grow quadratically)
+SIMPLE_CHECK_MAX_EDGES = 1024
+
+
+def contour_simple(points: np.ndarray) -> bool:
+    """
+    Check if closed contour of (n, 2) points never crosses or touches
+    itself, so every fill rule fills it the same
+    Conservative - near touching edges and contours longer than
+    SIMPLE_CHECK_MAX_EDGES count as crossing
+    """
+    # drop repeated points, closing point equal to first
+    keep = np.any(points != np.roll(points, 1, axis=0), axis=1)
+    points = points[keep] if keep.any() else points[:1]
+    count = len(points)
+    if count <= 3:
+        return True
+    if count > SIMPLE_CHECK_MAX_EDGES:
+        return False
+
+    # edge i runs from a[i] to b[i], last edge closes the contour
+    a, b = points, np.roll(points, -1, axis=0)
+    low, high = np.minimum(a, b), np.maximum(a, b)
+
+    # candidate pairs (i < j) - boxes overlap, edges are not neighbours
+    (low_x, low_y), (high_x, high_y) = low.T, high.T
+    overlap = (low_x[:, None] <= high_x) & (low_x <= high_x[:, None])
+    overlap &= (low_y[:, None] <= high_y) & (low_y <= high_y[:, None])
+    i, j = np.nonzero(np.triu(overlap, 2))
+    apart = j - i != count - 1
+    i, j = i[apart], j[apart]
+
+    def side(edge: np.ndarray, pts: np.ndarray) -> np.ndarray:
+        # cross product sign of pts against line of each edge
+        direction, rel = b[edge] - a[edge], pts - a[edge]
+        return direction[:, 0] * rel[:, 1] - direction[:, 1] * rel[:, 0]
+
+    crossing = (side(i, a[j]) * side(i, b[j]) <= 0) & (
+        side(j, a[i]) * side(j, b[i]) <= 0
+    )
+    return not crossing.any()
+
+
+def flatten_geometry(
+    points: np.ndarray, kinds: np.ndarray, flatness=DEFAULT_FLATNESS
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Flatten cubic curves of (n, 2) device space points
+    -------------------------------------------------
+    - kinds  - point kinds, each curve is handle1, handle2, dest
+    - curves start at the point just before handle1
+    - segment count per curve from Wang's formula (within flatness)
+    Returns flattened (m, 2) points and index of each source point's
+    last flattened point in it
+    """
+
+    # second differences of control polygon for each curve
+    dests = np.flatnonzero(kinds == CURVE_DEST)
+    p0, p1, p2, p3 = (points[dests - i] for i in (3, 2, 1, 0))
+    dd = np.maximum(np.abs(p0 - 2 * p1 + p2), np.abs(p1 - 2 * p2 + p3))
+    dd_norm = np.hypot(dd[:, 0], dd[:, 1])
+    segments = np.ceil(np.sqrt(0.75 * dd_norm / flatness)).astype(np.intp)
+
+    # flattened points emitted by each source point
+    emit = (kinds == VERTEX).astype(np.intp)
+    emit[dests] = np.maximum(segments, 1)
+    emit_end = np.cumsum(emit)
+
+    # source point and curve parameter for each flattened point
+    source = np.repeat(np.arange(len(points)), emit)
+    resolution = np.repeat(emit, emit)
+    step = np.arange(len(source)) - np.repeat(emit_end - emit, emit) + 1
+    t = (step / resolution)[:, None]
+
+    # vertices are evaluated as degenerate curves at t = 1
+    is_curve = kinds[source] == CURVE_DEST
+    c0, c1, c2, c3 = (1 - t) ** 3, 3 * (1 - t) ** 2 * t, 3 * (1 - t) * t ** 2, t ** 3
+    flat = c3 * points[source]
+    flat += c2 * points[np.where(is_curve, source - 1, source)]
+    flat += c1 * points[np.where(is_curve, source - 2, source)]
+    flat += c0 * points[np.where(is_curve, source - 3, source)]
+
+    return flat, emit_end - 1
+
+
 class DrawablePath(Drawable):
     def __init__(self, elem_id: str):
         super().__init__(elem_id)
 
         # core
-        self.subpaths: List[List[Point]] = []
-
-        # optimization
-        self.curve_resolution = 1
+        # flat (x, y) coords, kind of each point and subpath start points
+        # curves are stored as control points, flattened when drawn
+        self.coords = array("d")
+        self.kinds = array("B")
+        self.subpath_starts = array("I")
 
         # state
-        self.current_pos = Point((0, 0))
+        self.current_pos: FloatPair = (0.0, 0.0)
+        self._shared = False
+
+    def copy(self) -> "DrawablePath":
+        """
+        Get path sharing geometry with this one (<use> instances)
+        Geometry is copied on write, by whichever path is extended first
+        """
+        path = copy.copy(self)
+        self._shared = path._shared = True
+        return path
+
+    def _own_geometry(self):
+        """ Detach shared geometry before changing it """
+        self.coords = array("d", self.coords)
+        self.kinds = array("B", self.kinds)
+        self.subpath_starts = array("I", self.subpath_starts)
+        self._shared = False
+
+    def _add_point(self, point: Pair, kind: int, rel: bool) -> FloatPair:
+        if self._shared:
+            self._own_geometry()
+        x, y = float(point[0]), float(point[1])
+        if rel:
+            x += self.current_pos[0]
+            y += self.current_pos[1]
+        self.coords.extend((x, y))
+        self.kinds.append(kind)
+        return (x, y)
 
     def moveto(self, dest: Pair, rel=False):
-        dest_pt = (Point(dest) + self.current_pos) if rel else Point(dest)
-        self.subpaths.append([dest_pt])
-        self.current_pos = dest_pt
+        if self._shared:
+            self._own_geometry()
+        self.subpath_starts.append(len(self.kinds))
+        self.current_pos = self._add_point(dest, VERTEX, rel)
 
     def lineto(self, dest: Pair, rel=False):
-        dest_pt = (Point(dest) + self.current_pos) if rel else Point(dest)
-        current_subpath = self.subpaths[-1]
-        current_subpath.append(dest_pt)
-        self.current_pos = dest_pt
+        self.current_pos = self._add_point(dest, VERTEX, rel)
 
     def curveto(self, handle1: Pair, handle2: Pair, dest: Pair, rel=False):
-        p0 = self.current_pos
-        p1 = (Point(handle1) + self.current_pos) if rel else Point(handle1)
-        p2 = (Point(handle2) + self.current_pos) if rel else Point(handle2)
-        p3 = (Point(dest) + self.current_pos) if rel else Point(dest)
+        self._add_point(handle1, CURVE_HANDLE1, rel)
+        self._add_point(handle2, CURVE_HANDLE2, rel)
+        self.current_pos = self._add_point(dest, CURVE_DEST, rel)
 
-        resolution = 10
-        params = (i / resolution for i in range(1, resolution + 1))
-
-        for t in params:
-            c = [(1 - t) ** 3, 3 * (1 - t) ** 2 * t, 3 * (1 - t) * t ** 2, t ** 3]
-            bx = c[0] * p0.x + c[1] * p1.x + c[2] * p2.x + c[3] * p3.x
-            by = c[0] * p0.y + c[1] * p1.y + c[2] * p2.y + c[3] * p3.y
+    def closepath(self):
+        start = self.subpath_starts[-1]
+        dest = self.coords[2 * start], self.coords[2 * start + 1]
+        self.current_pos = self._add_point(dest, VERTEX, rel=False)
 
-            current_path = self.subpaths[-1]
-            current_path.append(Point((bx, by)))
+    def flatten(
+        self, transform=Transform(), flatness=DEFAULT_FLATNESS
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Transform all points at once and flatten curves in device space
+        Returns (m, 2) points and subpath offsets (subpaths + 1) into them
+        """
+        points = np.frombuffer(self.coords, dtype=np.float64).reshape(-1, 2)
+        points = points * transform.scale + transform.translate
+        kinds = np.frombuffer(self.kinds, dtype=np.uint8)
 
-        self.current_pos = p3
+        flat, last_index = flatten_geometry(points, kinds, flatness)
 
-    def closepath(self):
-        current_subpath = self.subpaths[-1]
-        dest = current_subpath[0]
-        current_subpath.append(dest)
-        self.current_pos = dest
+        # subpath start in flat = one past last point of previous source
+        starts = np.frombuffer(self.subpath_starts, dtype=np.uint32)
+        offsets = np.append(last_index[starts[1:] - 1] + 1, len(flat))
+        return flat, np.insert(offsets, 0, 0)
 
-    def draw(self, imdraw: ImageDraw, transform=Transform()):
-        """ Draw path on the image """
+    def draw(
+        self,
+        surface: Surface,
+        transform=Transform(),
+        flatness=DEFAULT_FLATNESS,
+        origin: Optional[Tuple[int, int]] = None,
+        recolor: Optional[Recolor] = None,
+    ) -> int:
+        """
+        Draw path on the image
+        All closable subpaths are filled as one shape under style fill rule
+        (holes are cut out)
+        """
 
         # skip transparent
-        fillcol = self.style.fillcolor
-        if not fillcol:
-            return
+        if not self.style.fillcolor or not len(self.subpath_starts):
+            return 0
+
+        fillcol = self.fill_color(recolor)
+        fillrule = self.style.fillrule
+        flat, offsets = self.flatten(transform, flatness)
+
+        # closable subpaths only
+        lengths = np.diff(offsets)
+        closable = lengths > 2
+        vertex_count = int(lengths[closable].sum())
+        if not vertex_count:
+            return 0
+
+        if isinstance(surface, CoverageSurface):
+            if origin is not None:
+                flat = flat - origin
+            filled = surface.fill(flat, offsets, fillcol, fillrule)
+            return vertex_count if filled else 0
+
+        # contours that can not overlap need no fill rule between them,
+        # pillow fills each one (evenodd within a contour, so nonzero
+        # contours must not cross themselves)
+        starts = offsets[:-1][closable]
+        ends = offsets[1:][closable]
+        if contours_disjoint(flat, offsets) and (
+            fillrule == EVENODD
+            or all(contour_simple(flat[i:j]) for i, j in zip(starts, ends))
+        ):
+            self._draw_contours(surface, flat, starts, ends, fillcol, origin)
+            return vertex_count
+
+        # evenodd - pillow fills each contour into a mask, xor of them
+        if fillrule == EVENODD:
+            filled = self._draw_evenodd(surface, flat, starts, ends, fillcol, origin)
+            return vertex_count if filled else 0
+
+        # nonzero overlapping contours - winding sampled at pixel centers
+        # in canvas space, pasted once over its box
+        mask = sample_mask(flat, offsets, surface.size, fillrule, origin or (0, 0))
+        if mask is None:
+            return 0
+        bits, box = mask
+        surface.paste(fillcol, box, Image.fromarray(bits))
+        return vertex_count
+
+    @staticmethod
+    def _draw_contours(
+        surface: PILImage,
+        flat: np.ndarray,
+        starts: np.ndarray,
+        ends: np.ndarray,
+        fillcol: Union[str, RGBATuple],
+        origin: Optional[Tuple[int, int]],
+    ):
+        """ Fill each contour on surface with pillow """
+
+        # pillow truncates vertices to int, so snap them in canvas space
+        # before moving origin (tiles then match a whole canvas draw)
+        if origin is not None:
+            flat = np.trunc(flat) - origin
+
+        imdraw = ImageDraw.Draw(surface)
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            imdraw.polygon(flat[start:end].ravel().tolist(), fill=fillcol)
+
+    @staticmethod
+    def _draw_evenodd(
+        surface: PILImage,
+        flat: np.ndarray,
+        starts: np.ndarray,
+        ends: np.ndarray,
+        fillcol: Union[str, RGBATuple],
+        origin: Optional[Tuple[int, int]],
+    ) -> bool:
+        """
+        Fill contours on surface under evenodd rule, through a mask over
+        their box (each contour flips the pixels pillow fills for it)
+        Returns False if box is outside surface
+        """
+
+        # snapped in canvas space as in _draw_contours, box in surface space
+        flat = np.trunc(flat) - (origin or (0, 0))
+        low = np.maximum(flat.min(axis=0).astype(int), 0)
+        high = np.minimum(flat.max(axis=0).astype(int) + 1, surface.size)
+        if np.any(low >= high):
+            return False
 
-        # filter closable paths for drawing
-        closed_paths = filter(lambda x: len(x) > 2, self.subpaths)
+        mask_size = tuple((high - low).tolist())
+        flat = flat - low
+        mask = Image.new("1", mask_size)
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            contour = Image.new("1", mask_size)
+            ImageDraw.Draw(contour).polygon(flat[start:end].ravel().tolist(), fill=1)
+            mask = ImageChops.logical_xor(mask, contour)
 
-        # apply transforms and draw
-        for path in closed_paths:
-            path_tuple = [tuple(p.transform(transform)) for p in path]
-            imdraw.polygon(path_tuple, fill=fillcol)
+        left, top = low.tolist()
+        right, bottom = high.tolist()
+        surface.paste(fillcol, (left, top, right, bottom), mask)
+        return True
 
 
 # OBJECT STORAGE
@@ -143,6 +458,9 @@ class DrawableObjectStore:
         # contains objects with id
         self._named: Dict[str, Drawable] = {}
 
+        # vertices generated by last draw_all
+        self.vertex_count = 0
+
     def __getitem__(self, key):
         return self._objects[key]
 
@@ -178,16 +496,33 @@ class DrawableObjectStore:
         self,
         image: Optional[PILImage] = None,
         bounding_box: Optional[Sequence[float]] = None,
+        flatness: Optional[float] = None,
+        origin: Optional[Tuple[int, int]] = None,
+        backend: str = POLYGON,
+        recolor: Optional[Recolor] = None,
     ) -> PILImage:
         """
         Draw all the drawables onto given image inside bounding box.
         If image is not given, creates a new image.
+        Curves are flattened to within flatness (device pixels),
+        DEFAULT_FLATNESS (read at call time) if None.
+        origin - pixel of full canvas (bounding box space) drawn at image
+        (0, 0), for drawing a large canvas in tiles.
+        backend - rasterizer, one of BACKENDS.
+        recolor - maps rgba fill of each drawable to the rgba drawn, lets
+        anti-aliased edges keep their coverage through color remapping.
         Modifies image inplace and also returns it.
         """
+        if backend not in BACKENDS:
+            raise ValueError(f"unsupported backend - {backend}")
+        if flatness is None:
+            flatness = DEFAULT_FLATNESS
 
         # get or construct image
         image = image or Image.new("RGBA", self.canvas_size)
-        imdraw = ImageDraw.Draw(image)
+        surface: Surface = image
+        if backend == COVERAGE:
+            surface = CoverageSurface.from_image(image)
 
         # construct transform if bbox given
         if bounding_box:
@@ -199,7 +534,12 @@ class DrawableObjectStore:
             transform = Transform()
 
         # draw all
+        self.vertex_count = 0
         for drw in self._objects:
-            drw.draw(imdraw, transform)
+            self.vertex_count += drw.draw(surface, transform, flatness, origin, recolor)
+
+        if isinstance(surface, CoverageSurface):
+            instrument.peak_buffers("peak_image_bytes", image, surface.pixels)
+            surface.paste_into(image)
 
         return image
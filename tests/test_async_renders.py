@@ -0,0 +1,76 @@
+# Async Renders Tests
+# -------------------
+# Reduced benchmarks/async_renders.py - concurrent requests on a thread
+# executor match serial renders, cancelling a request stops the rest
+# Run from repository root - python -m pytest tests
+
+import os
+import asyncio
+
+import pytest  # type: ignore
+
+from icongen.aio import AsyncRenderer
+from icongen.stream import RenderSpec, render_bytes
+
+ICON_DIR = os.path.join(os.path.dirname(__file__), os.pardir, "icons", "svg")
+ICONS = [os.path.join(ICON_DIR, name) for name in ("bell.svg", "app_store.svg")]
+
+SPECS = [
+    RenderSpec(ICONS[0], "blue", 32),
+    RenderSpec(ICONS[0], "red", 32),
+    RenderSpec(ICONS[1], "green", 32),
+    RenderSpec(ICONS[1], "blue", 32, "icns"),
+    RenderSpec(ICONS[1], "red", 32),
+    RenderSpec(ICONS[0], "green", 32),
+]
+
+
+@pytest.fixture(scope="module")
+def expected():
+    return {spec: render_bytes(spec) for spec in SPECS}
+
+
+def test_concurrent_requests_match_serial(expected):
+    async def run():
+        async with AsyncRenderer("thread", jobs=4) as renderer:
+
+            async def request(chunk):
+                return [item async for item in renderer.render_many(chunk, 2)]
+
+            results = await asyncio.gather(request(SPECS[::2]), request(SPECS[1::2]))
+            return [item for result in results for item in result]
+
+    results = asyncio.run(run())
+    assert sorted(spec for spec, _ in results) == sorted(SPECS)
+    for spec, data in results:
+        assert data == expected[spec], spec
+
+
+def test_cancel_stops_remaining_renders():
+    started = []
+
+    def pull():
+        for spec in SPECS:
+            started.append(spec)
+            yield spec
+
+    async def run():
+        received = []
+        async with AsyncRenderer("thread", jobs=2) as renderer:
+
+            async def request():
+                async for item in renderer.render_many(pull(), concurrency=2):
+                    received.append(item)
+                    await asyncio.sleep(3600)
+
+            task = asyncio.ensure_future(request())
+            while not received:
+                await asyncio.sleep(0.01)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            assert task.cancelled()
+        return received
+
+    received = asyncio.run(run())
+    assert len(received) == 1
+    assert len(started) == 2
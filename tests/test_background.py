@@ -0,0 +1,97 @@
+# Background Tests
+# ----------------
+# draw_circle must match the per pixel closure it replaced, byte for byte
+# Reference colors come from the scalar gradient formula, one pixel at a time
+# Run from repository root - python -m pytest tests
+
+import math
+
+import pytest  # type: ignore
+from PIL import Image  # type: ignore
+from PIL.Image import Image as PILImage  # type: ignore
+
+from icongen.minimal_round import RenderContext, draw_circle
+from icongen.palette import PALETTES
+from icongen.utils import Gradient
+
+
+def hex_rgba(hex_code: str) -> tuple:
+    """ Get (r, g, b, 255) of #rrggbb """
+    return tuple(int(hex_code[i : i + 2], 16) for i in (1, 3, 5)) + (255,)
+
+
+def gradient_pixel(x: int, y: int, w: int, h: int, start: tuple, end: tuple):
+    """
+    Soft two color gradient top to bottom (LinearGradient.two_color at 90)
+    Position is snapped to the nearest of Gradient.TABLE_SIZE samples,
+    then sigmoid spaced and interpolated between start and end colors
+    """
+    cos_t = math.cos(math.radians(90))
+    sin_t = math.sin(math.radians(90))
+    r_min = min(0.0, w * cos_t) + min(0.0, h * sin_t)
+    r_max = max(0.0, w * cos_t) + max(0.0, h * sin_t)
+    position = (x * cos_t + y * sin_t - r_min) / (r_max - r_min)
+
+    steps = Gradient.TABLE_SIZE - 1
+    sample = round(min(max(position * steps, 0), steps)) / steps
+    adj = 2.0 * (sample - 0.5)
+    spaced = (1 + adj / math.sqrt(1 + adj * adj)) / 2
+    return tuple(round(a + (b - a) * spaced) for a, b in zip(start, end))
+
+
+def draw_circle_pixelwise(image: PILImage, context: RenderContext):
+    """ Previous draw_circle, one python call per pixel """
+    w, h = image.width, image.height
+    radius, outline = context.circle_fraction, context.outline_fraction
+
+    # two_color puts col2 at the start of the direction
+    _, col1, col2 = context.palette["primary"].split(" ")
+    start, end = hex_rgba(col2), hex_rgba(col1)
+
+    def get_circle_pixel(i):
+        y, x = i // w, i % w
+        dist_2 = (x - w / 2) ** 2 + (y - h / 2) ** 2
+
+        # interior
+        rad_2 = (radius * w / 2) ** 2
+        if dist_2 <= rad_2:
+            return gradient_pixel(x, y, w, h, start, end)
+
+        # outline
+        out_2 = (outline * w / 2) ** 2
+        if dist_2 <= out_2:
+            return (255,) * 4
+
+        # exterior
+        return (0, 0, 0, 0)
+
+    image.putdata(list(map(get_circle_pixel, range(w * h))))
+
+
+def render_both(scheme: str, size, supersample: int = 1):
+    """ Get (vectorized, pixelwise) background images """
+    context = RenderContext.create(scheme, size, supersample)
+    canvas = context.canvas_size
+    vectorized = Image.new("RGBA", canvas)
+    pixelwise = Image.new("RGBA", canvas)
+    draw_circle(vectorized, context)
+    draw_circle_pixelwise(pixelwise, context)
+    return vectorized, pixelwise
+
+
+@pytest.mark.parametrize("scheme", sorted(PALETTES))
+def test_matches_pixelwise_every_palette(scheme):
+    vectorized, pixelwise = render_both(scheme, (128, 128))
+    assert vectorized.tobytes() == pixelwise.tobytes()
+
+
+@pytest.mark.parametrize("size", [(1, 1), (31, 31), (64, 64), (96, 48), (257, 257)])
+def test_matches_pixelwise_sizes(size):
+    # odd and non square canvases put the center between pixels
+    vectorized, pixelwise = render_both("blue", size)
+    assert vectorized.tobytes() == pixelwise.tobytes()
+
+
+def test_matches_pixelwise_supersampled():
+    vectorized, pixelwise = render_both("green", (64, 64), supersample=4)
+    assert vectorized.tobytes() == pixelwise.tobytes()
@@ -0,0 +1,87 @@
+# Color Map Tests
+# ---------------
+# Registered remap rules take part in every render path
+# Run from repository root - python -m pytest tests
+
+import io
+
+import numpy as np  # type: ignore
+import pytest  # type: ignore
+from PIL import Image  # type: ignore
+
+from icongen import minimal_round
+from icongen.minimal_round import ColorMap
+from icongen.palette import PALETTES
+from svg2png.vector import BACKENDS
+
+GREEN = (0, 255, 0, 255)
+PURPLE = (120, 40, 200, 255)
+
+SVG = (
+    '<svg version="1.1" xmlns="http://www.w3.org/2000/svg" '
+    'viewBox="0 0 100 100" width="100" height="100">'
+    '<path fill="#00ff00" d="M10 10 L90 10 L90 50 L10 50 Z"/>'
+    '<path fill="#ff0000" d="M10 60 L90 60 L90 90 L10 90 Z"/>'
+    "</svg>"
+)
+
+
+def green_to_purple():
+    """ Rule replacing pure green with purple """
+    match = lambda px: np.all(px == GREEN, axis=-1)
+    return (match, PURPLE)
+
+
+@pytest.fixture
+def svg_path(tmp_path):
+    path = tmp_path / "two_bars.svg"
+    path.write_text(SVG)
+    return str(path)
+
+
+def center_of_bar(image, top: bool):
+    """ Get pixel in the middle of the green (top) or red (bottom) bar """
+    w, h = image.size
+    return image.getpixel((w // 2, int(h * (0.4 if top else 0.6))))
+
+
+def test_remap_and_remap_array_agree():
+    cmap = ColorMap(PALETTES["blue"], [green_to_purple()])
+    pixels = np.array([[GREEN, (255, 0, 0, 255), (7, 7, 7, 7), (1, 2, 3, 0)]])
+    bulk = cmap.remap_array(pixels.astype(np.uint8))
+    single = [cmap.remap(tuple(int(c) for c in px)) for px in pixels[0]]
+    assert [tuple(px) for px in bulk[0].tolist()] == single
+    assert single[0] == PURPLE
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_render_svg_applies_rules(svg_path, backend):
+    plain = minimal_round.render_svg(svg_path, (64, 64), "blue", backend)
+    ruled = minimal_round.render_svg(
+        svg_path, (64, 64), "blue", backend, remap_rules=[green_to_purple()]
+    )
+    assert center_of_bar(plain, top=True) == GREEN
+    assert center_of_bar(ruled, top=True) == PURPLE
+    assert center_of_bar(plain, top=False) == center_of_bar(ruled, top=False)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_variants_match_single_renders(svg_path, backend):
+    rules = [green_to_purple()]
+    variants = minimal_round.render_svg_variants(
+        svg_path, (48, 48), ["blue", "red", "green"], backend, remap_rules=rules
+    )
+    for name, image in variants.items():
+        single = minimal_round.render_svg(svg_path, (48, 48), name, backend, rules)
+        assert image.tobytes() == single.tobytes()
+
+
+def test_tiled_applies_rules(svg_path):
+    rules = [green_to_purple()]
+    buf = io.BytesIO()
+    minimal_round.render_svg_tiled(
+        svg_path, (64, 64), buf, "blue", memory_budget=2 ** 16, remap_rules=rules
+    )
+    tiled = Image.open(io.BytesIO(buf.getvalue())).convert("RGBA")
+    whole = minimal_round.render_svg(svg_path, (64, 64), "blue", remap_rules=rules)
+    assert tiled.tobytes() == whole.tobytes()
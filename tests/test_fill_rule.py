@@ -0,0 +1,55 @@
+# Fill Rule Tests
+# ---------------
+# Polygon backend fills paths like the coverage backend under each rule,
+# including single contours that cross themselves
+# Run from repository root - python -m pytest tests
+
+import numpy as np  # type: ignore
+import pytest  # type: ignore
+from PIL import Image  # type: ignore
+
+from svg2png import parser, vector
+from svg2png.vector.draw import contour_simple
+
+PENTAGRAM = "M50 5 L79 95 L2 39 L98 39 L21 95 Z"
+# two squares wound the same way, disjoint boxes
+SQUARES = "M5 5 L45 5 L45 45 L5 45 Z M55 55 L95 55 L95 95 L55 95 Z"
+
+
+def draw_path(path_data: str, fill_rule: str, backend: str) -> Image.Image:
+    path = vector.DrawablePath("path")
+    parser.parse_svg_path(path_data, path)
+    path.style = vector.DrawableStyle({"fill": "#ffffff", "fill-rule": fill_rule})
+    store = vector.DrawableObjectStore((100, 100))
+    store.append("", path)
+    return store.draw_all(Image.new("RGBA", (100, 100)), backend=backend)
+
+
+@pytest.mark.parametrize("backend", vector.BACKENDS)
+@pytest.mark.parametrize("fill_rule, alpha", [("nonzero", 255), ("evenodd", 0)])
+def test_pentagram_center(backend, fill_rule, alpha):
+    image = draw_path(PENTAGRAM, fill_rule, backend)
+    assert image.getpixel((50, 50))[3] == alpha
+    # a point of the star is filled under both rules
+    assert image.getpixel((50, 15))[3] == 255
+
+
+@pytest.mark.parametrize("fill_rule", ["nonzero", "evenodd"])
+def test_disjoint_contours_fill_both(fill_rule):
+    image = draw_path(SQUARES, fill_rule, vector.POLYGON)
+    assert image.getpixel((25, 25))[3] == 255
+    assert image.getpixel((75, 75))[3] == 255
+    assert image.getpixel((75, 25))[3] == 0
+
+
+def test_contour_simple():
+    square = np.array([[0, 0], [10, 0], [10, 10], [0, 10]], float)
+    bowtie = np.array([[0, 0], [10, 10], [10, 0], [0, 10]], float)
+    assert contour_simple(square)
+    # explicit closing point and repeated points are not crossings
+    assert contour_simple(np.vstack([square, square[:1]]))
+    assert contour_simple(np.repeat(square, 2, axis=0))
+    assert not contour_simple(bowtie)
+    # loop touching itself at one point
+    touching = np.array([[0, 0], [10, 0], [5, 5], [10, 10], [0, 10], [5, 5]], float)
+    assert not contour_simple(touching)
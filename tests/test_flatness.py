@@ -0,0 +1,55 @@
+# Flatness Tests
+# --------------
+# Curve tolerance reaches draw_all from every render entry point
+# Run from repository root - python -m pytest tests
+
+import pytest  # type: ignore
+
+from icongen import minimal_round
+from svg2png.vector import draw
+
+# circle of radius 40 as four cubic arcs
+SVG = (
+    '<svg version="1.1" xmlns="http://www.w3.org/2000/svg" '
+    'viewBox="0 0 100 100" width="100" height="100">'
+    '<path fill="#ffffff" d="M50 10 C72 10 90 28 90 50 C90 72 72 90 50 90 '
+    'C28 90 10 72 10 50 C10 28 28 10 50 10 Z"/>'
+    "</svg>"
+)
+
+
+@pytest.fixture
+def svg_path(tmp_path):
+    path = tmp_path / "circle.svg"
+    path.write_text(SVG)
+    return str(path)
+
+
+def test_render_svg_uses_flatness(svg_path):
+    fine = minimal_round.render_svg(svg_path, (128, 128), "blue", flatness=0.1)
+    coarse = minimal_round.render_svg(svg_path, (128, 128), "blue", flatness=20.0)
+    default = minimal_round.render_svg(svg_path, (128, 128), "blue")
+    assert fine.tobytes() != coarse.tobytes()
+    assert default.tobytes() != coarse.tobytes()
+
+
+def test_default_read_at_call_time(svg_path, monkeypatch):
+    coarse = minimal_round.render_svg(svg_path, (128, 128), "blue", flatness=20.0)
+    monkeypatch.setattr(draw, "DEFAULT_FLATNESS", 20.0)
+    default = minimal_round.render_svg(svg_path, (128, 128), "blue")
+    assert default.tobytes() == coarse.tobytes()
+
+
+def test_sizes_take_flatness_per_size(svg_path):
+    images = minimal_round.render_svg_sizes(
+        svg_path, [32, 64], "blue", flatness={64: 20.0}
+    )
+    plain = minimal_round.render_svg_sizes(svg_path, [32, 64], "blue")
+    assert images[32].tobytes() == plain[32].tobytes()
+    assert images[64].tobytes() != plain[64].tobytes()
+
+
+def test_context_resized_keeps_flatness():
+    context = minimal_round.RenderContext.create("blue", (64, 64), flatness=2.0)
+    assert context.resized((32, 32), 4).flatness == 2.0
+    assert context.resized((32, 32), 4, 0.5).flatness == 0.5
@@ -0,0 +1,81 @@
+# Path Parse Tests
+# ----------------
+# svg <path> data - repeated arguments, moveto / closepath, number forms
+# Run from repository root - python -m pytest tests
+
+from svg2png import parser, vector
+from svg2png.vector.draw import VERTEX, CURVE_HANDLE1, CURVE_HANDLE2, CURVE_DEST
+
+
+def parse(command_str: str) -> vector.DrawablePath:
+    path = vector.DrawablePath("path")
+    parser.parse_svg_path(command_str, path)
+    return path
+
+
+def points(path: vector.DrawablePath) -> list:
+    coords = list(path.coords)
+    return list(zip(coords[::2], coords[1::2]))
+
+
+def test_numbers_with_exponents_and_packed_decimals():
+    tokens = list(parser.tokenize_svg_path("M1e1-2.5.5L-.5e-1+3E2"))
+    assert tokens == [("M", [10.0, -2.5, 0.5]), ("L", [-0.05, 300.0])]
+
+
+def test_exponent_numbers_parse_as_coordinates():
+    path = parse("M1e1-2.5L.5.5")
+    assert points(path) == [(10.0, -2.5), (0.5, 0.5)]
+
+
+def test_lineto_repeats_for_extra_pairs():
+    path = parse("M0 0 L 1 2 3 4")
+    assert points(path) == [(0, 0), (1, 2), (3, 4)]
+    assert list(path.kinds) == [VERTEX] * 3
+
+
+def test_incomplete_trailing_group_is_dropped():
+    path = parse("M0 0 L 1 2 3")
+    assert points(path) == [(0, 0), (1, 2)]
+
+
+def test_moveto_pairs_become_linetos():
+    path = parse("M 1 1 2 2 3 3")
+    assert points(path) == [(1, 1), (2, 2), (3, 3)]
+    assert list(path.subpath_starts) == [0]
+
+
+def test_relative_moveto_after_closepath():
+    # closepath returns to the subpath start, next m is relative to it
+    path = parse("m1 1 2 2z m1 1")
+    assert points(path) == [(1, 1), (3, 3), (1, 1), (2, 2)]
+    assert list(path.subpath_starts) == [0, 3]
+
+
+def test_horizontal_and_vertical_lines():
+    path = parse("M10 20 H 30 V 40 h -5 v -15")
+    assert points(path) == [(10, 20), (30, 20), (30, 40), (25, 40), (25, 25)]
+
+
+def test_repeated_horizontal_arguments():
+    path = parse("M0 0 h 1 2 3")
+    assert points(path) == [(0, 0), (1, 0), (3, 0), (6, 0)]
+
+
+def test_chained_curves():
+    path = parse("M0 0 C 1 1 2 2 3 3 4 4 5 5 6 6")
+    assert points(path) == [(0, 0)] + [(i, i) for i in range(1, 7)]
+    curve = [CURVE_HANDLE1, CURVE_HANDLE2, CURVE_DEST]
+    assert list(path.kinds) == [VERTEX] + curve * 2
+
+
+def test_relative_chained_curves_start_at_each_dest():
+    path = parse("M1 1 c 1 0 1 0 1 0 1 0 1 0 1 0")
+    assert points(path)[3] == (2, 1)
+    assert points(path)[6] == (3, 1)
+
+
+def test_unsupported_command_skips_its_arguments(capsys):
+    path = parse("M0 0 A 5 5 0 0 1 10 10 L 3 4")
+    assert points(path) == [(0, 0), (3, 4)]
+    assert "A command not supported" in capsys.readouterr().out
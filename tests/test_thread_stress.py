@@ -0,0 +1,38 @@
+# Thread Stress Tests
+# -------------------
+# Reduced benchmarks/thread_stress.py - a few icons in mixed palettes and
+# sizes rendered from 8 threads in shuffled order match serial renders
+# Run from repository root - python -m pytest tests
+
+import os
+import random
+import itertools
+
+from icongen.palette import PALETTES
+from icongen.stream import RenderSpec, render_bytes, render_many
+
+ICON_DIR = os.path.join(os.path.dirname(__file__), os.pardir, "icons", "svg")
+ICONS = [
+    os.path.join(ICON_DIR, name) for name in ("bell.svg", "app_store.svg", "mail.svg")
+]
+
+
+def test_threaded_renders_match_serial():
+    specs = [
+        RenderSpec(svg_path, color, size)
+        for (svg_path, color), size in zip(
+            itertools.product(ICONS, sorted(PALETTES)), itertools.cycle([16, 32])
+        )
+    ]
+    # icns mixes supersample factors within one render
+    specs.append(RenderSpec(ICONS[0], "blue", format="icns"))
+    expected = {spec: render_bytes(spec) for spec in specs}
+
+    rng = random.Random(0)
+    for _ in range(2):
+        order = specs[:]
+        rng.shuffle(order)
+        results = list(render_many(order, jobs=8, threads=True))
+        assert sorted(spec for spec, _ in results) == sorted(specs)
+        for spec, data in results:
+            assert data == expected[spec], spec
@@ -0,0 +1,57 @@
+# Use Style Tests
+# ---------------
+# <use> instances keep the fill-rule of the path they reference unless
+# the <use> or one of its ancestors sets one
+# Run from repository root - python -m pytest tests
+
+import pytest  # type: ignore
+from PIL import Image  # type: ignore
+
+from svg2png import parser
+
+# square ring, outer and inner contours wound the same way
+RING = "M10 10 L90 10 L90 90 L10 90 Z M30 30 L70 30 L70 70 L30 70 Z"
+
+
+def write_svg(tmp_path, use: str) -> str:
+    path = tmp_path / "ring.svg"
+    path.write_text(
+        '<svg version="1.1" xmlns="http://www.w3.org/2000/svg" '
+        'xmlns:xlink="http://www.w3.org/1999/xlink" '
+        'viewBox="0 0 100 100" width="100" height="100">'
+        f'<defs><path id="ring" fill="#ffffff" fill-rule="evenodd" d="{RING}"/></defs>'
+        f"{use}</svg>"
+    )
+    return str(path)
+
+
+def instance_rule(tmp_path, use: str) -> str:
+    store = parser.parse_svg_file(write_svg(tmp_path, use), use_cache=False)
+    (instance,) = list(store)
+    return instance.style.fillrule
+
+
+def test_use_keeps_referenced_fill_rule(tmp_path):
+    rule = instance_rule(tmp_path, '<use xlink:href="#ring" fill="#ff0000"/>')
+    assert rule == "evenodd"
+
+
+def test_use_fill_rule_overrides(tmp_path):
+    rule = instance_rule(tmp_path, '<use xlink:href="#ring" fill-rule="nonzero"/>')
+    assert rule == "nonzero"
+
+
+def test_ancestor_fill_rule_overrides(tmp_path):
+    use = '<g fill-rule="nonzero"><use xlink:href="#ring"/></g>'
+    assert instance_rule(tmp_path, use) == "nonzero"
+
+
+@pytest.mark.parametrize("backend", ["polygon", "coverage"])
+def test_use_of_evenodd_ring_leaves_hole(tmp_path, backend):
+    store = parser.parse_svg_file(
+        write_svg(tmp_path, '<use xlink:href="#ring"/>'), use_cache=False
+    )
+    image = Image.new("RGBA", (100, 100))
+    store.draw_all(image, (0, 0, 100, 100), backend=backend)
+    assert image.getpixel((50, 50))[3] == 0
+    assert image.getpixel((20, 20))[3] == 255